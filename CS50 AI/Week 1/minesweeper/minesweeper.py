@@ -1,6 +1,14 @@
 import itertools
+import math
 import random
 
+# Maximum number of search nodes spent enumerating one frontier component
+# before falling back to sampling its mine configurations
+ENUMERATION_LIMIT = 50000
+
+# Number of configurations drawn for a component that is too large to enumerate
+SAMPLE_SIZE = 2000
+
 
 class Minesweeper:
     """
@@ -83,6 +91,104 @@ class Minesweeper:
         """
         return self.mines_found == self.mines
 
+    def reveal(self, cell):
+        """
+        Reveals a safe cell and, if it has no nearby mines, floods out
+        across the connected region of cells with no nearby mines.
+        Returns a dictionary mapping every revealed cell to its number
+        of nearby mines.
+        """
+        revealed = {cell: self.nearby_mines(cell)}
+        frontier = [cell] if revealed[cell] == 0 else []
+        while frontier:
+            i, j = frontier.pop()
+            for x in range(max(0, i - 1), min(self.height, i + 2)):
+                for y in range(max(0, j - 1), min(self.width, j + 2)):
+                    if (x, y) in revealed:
+                        continue
+                    count = self.nearby_mines((x, y))
+                    revealed[(x, y)] = count
+                    if count == 0:
+                        frontier.append((x, y))
+        return revealed
+
+
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game representation backed by flat byte arrays,
+    suited to very large boards.
+    `board[i * width + j]` is 1 for a mine and `counts` holds the
+    precomputed number of nearby mines of every cell.
+    """
+
+    def __init__(self, height=8, width=8, mines=8):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Sample mine positions without replacement
+        positions = random.sample(range(height * width), mines)
+        self.board = bytearray(height * width)
+        for position in positions:
+            self.board[position] = 1
+        self.mines = set(divmod(position, width) for position in positions)
+
+        # Count nearby mines of all cells in one box-sum pass
+        self.counts = neighbour_counts(self.board, height, width)
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            row = self.board[i * self.width : (i + 1) * self.width]
+            print("".join("|X" if mine else "| " for mine in row) + "|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        return self.board[i * self.width + j] == 1
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return self.counts[i * self.width + j]
+
+
+def neighbour_counts(board, height, width):
+    """
+    Returns a bytearray holding, for every cell of the flat `board`,
+    the number of mines in the 3x3 window around it (excluding the cell).
+    Rows are summed horizontally first and then the row sums vertically.
+    """
+    rows = []
+    for i in range(height):
+        row = board[i * width : (i + 1) * width]
+        left = b"\0" + row[:-1]
+        right = row[1:] + b"\0"
+        rows.append([a + b + c for a, b, c in zip(left, row, right)])
+
+    counts = bytearray(height * width)
+    empty = [0] * width
+    for i in range(height):
+        above = rows[i - 1] if i > 0 else empty
+        below = rows[i + 1] if i < height - 1 else empty
+        row = board[i * width : (i + 1) * width]
+        counts[i * width : (i + 1) * width] = bytes(
+            a + b + c - d for a, b, c, d in zip(above, rows[i], below, row)
+        )
+    return counts
+
 
 class Sentence:
     """
@@ -101,6 +207,18 @@ class Sentence:
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def __len__(self):
+        return len(self.cells)
+
+    def __sub__(self, other):
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is in `other`.
+        """
+        return self.cells.issubset(other.cells)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -137,16 +255,202 @@ class Sentence:
             self.cells.remove(cell)
 
 
+class BitSentence:
+    """
+    Logical statement about a Minesweeper game, like `Sentence`, with the
+    cells stored as a small integer bitmask relative to the sentence's own
+    top-left corner (row, col): cell (i, j) is bit
+    (i - row) * SPAN + (j - col). Masks are kept normalized, so the corner
+    is always the smallest row and column of the cells, and a sentence of
+    nearby cells costs a few bits wherever it is on the board.
+    """
+
+    # Number of columns a sentence may span, those of a cell's neighbourhood
+    SPAN = 3
+
+    def __init__(self, cells, count):
+        cells = list(cells)
+        self.row = min((i for i, _ in cells), default=0)
+        self.col = min((j for _, j in cells), default=0)
+        self.bits = 0
+        for i, j in cells:
+            if not 0 <= j - self.col < self.SPAN:
+                raise ValueError(f"cells span more than {self.SPAN} columns")
+            self.bits |= 1 << ((i - self.row) * self.SPAN + j - self.col)
+        self.count = count
+
+    @classmethod
+    def from_bits(cls, row, col, bits, count):
+        """
+        Returns a sentence over the cells set in `bits`, relative to (row, col).
+        """
+        sentence = cls((), count)
+        sentence.row, sentence.col, sentence.bits = normalize(row, col, bits)
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        The set of (i, j) cells in the sentence.
+        """
+        cells = set()
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            i, j = divmod(low.bit_length() - 1, self.SPAN)
+            cells.add((self.row + i, self.col + j))
+            bits ^= low
+        return cells
+
+    def __eq__(self, other):
+        return (self.row, self.col, self.bits, self.count) == (
+            other.row,
+            other.col,
+            other.bits,
+            other.count,
+        )
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __sub__(self, other):
+        shifted = align(self.row, self.col, other.row, other.col, other.bits)
+        if shifted is None:
+            return BitSentence.from_bits(
+                self.row, self.col, self.bits, self.count - other.count
+            )
+        return BitSentence.from_bits(
+            self.row, self.col, self.bits & ~shifted, self.count - other.count
+        )
+
+    def issubset(self, other):
+        """
+        Returns True if every cell of this sentence is in `other`.
+        """
+        if not self.bits:
+            return True
+        shifted = align(other.row, other.col, self.row, self.col, self.bits)
+        return shifted is not None and shifted & other.bits == shifted
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.count == len(self):
+            return self.cells
+        else:
+            return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        else:
+            return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if self.bits & bit:
+            self.row, self.col, self.bits = normalize(
+                self.row, self.col, self.bits ^ bit
+            )
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        bit = self.bit(cell)
+        if self.bits & bit:
+            self.row, self.col, self.bits = normalize(
+                self.row, self.col, self.bits ^ bit
+            )
+
+    def bit(self, cell):
+        """
+        Returns the bit of `cell` in this sentence's mask, or 0 if the
+        cell is outside the sentence's columns or above its first row.
+        """
+        i, j = cell[0] - self.row, cell[1] - self.col
+        if i < 0 or not 0 <= j < self.SPAN:
+            return 0
+        return 1 << (i * self.SPAN + j)
+
+
+def normalize(row, col, bits):
+    """
+    Returns (row, col, bits) with the corner moved down and right past
+    any empty rows and columns of the mask, so equal sets of cells always
+    have equal representations.
+    """
+    span = BitSentence.SPAN
+    if not bits:
+        return 0, 0, 0
+    row_mask = (1 << span) - 1
+    while not bits & row_mask:
+        bits >>= span
+        row += 1
+
+    # Bits of every column, folded into a single row
+    columns = 0
+    rest = bits
+    while rest:
+        columns |= rest & row_mask
+        rest >>= span
+    while not columns & 1:
+        columns >>= 1
+        bits >>= 1
+        col += 1
+    return row, col, bits
+
+
+def align(row, col, inner_row, inner_col, inner_bits):
+    """
+    Returns the mask `inner_bits`, relative to (inner_row, inner_col),
+    moved to be relative to (row, col) instead; or None if some of its
+    cells lie above or outside the columns of a sentence at (row, col).
+    """
+    span = BitSentence.SPAN
+    if inner_row < row or inner_col < col:
+        return None
+    shift = inner_col - col
+    if shift:
+
+        # Cells pushed past the last column would wrap into the next row
+        row_mask = (1 << span) - 1
+        overflow = row_mask ^ (row_mask >> shift)
+        rest = inner_bits
+        while rest:
+            if rest & overflow:
+                return None
+            rest >>= span
+    return inner_bits << ((inner_row - row) * span + shift)
+
+
 class MinesweeperAI:
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8, bitset=False):
 
-        # Set initial height and width
+        # Set initial height, width, and total number of mines
         self.height = height
         self.width = width
+        self.total_mines = mines
+
+        # Store sentences as bitmasks instead of sets of cells
+        self.bitset = bitset
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -194,15 +498,51 @@ class MinesweeperAI:
         self.moves_made.add(cell)
         self.mark_safe(cell)
         neighbours, count = self.get_neighbours(cell, count)
-        sentence = Sentence(neighbours, count)
+        sentence = self.new_sentence(neighbours, count)
         if sentence not in self.knowledge:
             self.knowledge.append(sentence)
         self.infer_knowledge(True)
 
+    def add_knowledge_many(self, revealed):
+        """
+        Called when the Minesweeper board reveals a whole region at once,
+        e.g. after flooding out from a cell with no nearby mines.
+        `revealed` maps each revealed (safe) cell to its count of nearby mines.
+
+        Every cell is marked as a move made and as safe in a single pass over
+        the knowledge base, one sentence is added per cell, and inference
+        runs once at the end.
+        """
+        revealed = dict(revealed)
+        cells = set(revealed)
+        self.moves_made |= cells
+        self.safes |= cells
+        for sentence in self.knowledge:
+            for cell in sentence.cells & cells:
+                sentence.mark_safe(cell)
+
+        known = set((frozenset(s.cells), s.count) for s in self.knowledge)
+        for cell, count in revealed.items():
+            neighbours, count = self.get_neighbours(cell, count)
+            if not neighbours or (frozenset(neighbours), count) in known:
+                continue
+            known.add((frozenset(neighbours), count))
+            self.knowledge.append(self.new_sentence(neighbours, count))
+        self.infer_knowledge(True)
+
+    def new_sentence(self, cells, count):
+        """
+        Returns a new sentence in the representation used by the AI.
+        """
+        if self.bitset:
+            return BitSentence(cells, count)
+        return Sentence(cells, count)
+
     def infer_knowledge(self, flag):
         if flag == False:
             return
         flag = False
+        known = len(self.safes) + len(self.mines)
 
         # Iterating in reverse and deleting the sentences which are full mines or safes
         for i in range(len(self.knowledge) - 1, -1, -1):
@@ -210,33 +550,65 @@ class MinesweeperAI:
             if sent.count == 0:
                 self.update_safe(sent.cells)
                 del self.knowledge[i]
-            elif len(sent.cells) == sent.count:
+            elif len(sent) == sent.count:
                 self.update_mines(sent.cells)
                 del self.knowledge[i]
 
+        # Marking cells may have solved sentences already visited above
+        if len(self.safes) + len(self.mines) != known:
+            flag = True
+
+        if self.bitset:
+            if self.infer_bits():
+                flag = True
+            self.infer_knowledge(flag=flag)
+            return
+
         additional_knowledge = []
         for sent_1 in self.knowledge:
             for sentence in self.knowledge:
                 if sent_1 == sentence:
                     continue
-                elif sentence.cells.issubset(sent_1.cells):
-                    additional_knowledge.append(
-                        Sentence(
-                            sent_1.cells - sentence.cells, sent_1.count - sentence.count
-                        )
-                    )
-                elif sent_1.cells.issubset(sentence.cells):
-                    additional_knowledge.append(
-                        Sentence(
-                            sentence.cells - sent_1.cells, sentence.count - sent_1.count
-                        )
-                    )
+                elif sentence.issubset(sent_1):
+                    additional_knowledge.append(sent_1 - sentence)
+                elif sent_1.issubset(sentence):
+                    additional_knowledge.append(sentence - sent_1)
         for sent in additional_knowledge:
             if sent not in self.knowledge:
                 self.knowledge.append(sent)
                 flag = True
         self.infer_knowledge(flag=flag)  # Recursively adding additional knowledge
 
+    def infer_bits(self):
+        """
+        Same subset inference as `infer_knowledge`, done directly on the
+        (row, col, bits, count) tuples of BitSentence knowledge.
+        Returns True if any new sentence was added.
+        """
+        entries = [
+            (sent.row, sent.col, sent.bits, sent.count) for sent in self.knowledge
+        ]
+        existing = set(entries)
+        added = False
+        for row_1, col_1, bits_1, count_1 in entries:
+            for row, col, bits, count in entries:
+                if row < row_1 or col < col_1 or not bits:
+                    continue
+                if row == row_1 and col == col_1 and bits == bits_1:
+                    continue
+
+                # Only a sentence starting below and right of another can be
+                # its subset; look for it inside the other's mask
+                shifted = align(row_1, col_1, row, col, bits)
+                if shifted is None or shifted & bits_1 != shifted:
+                    continue
+                new = normalize(row_1, col_1, bits_1 ^ shifted) + (count_1 - count,)
+                if new not in existing:
+                    existing.add(new)
+                    self.knowledge.append(BitSentence.from_bits(*new))
+                    added = True
+        return added
+
     def make_safe_move(self):
         """
         Returns a safe cell to choose on the Minesweeper board.
@@ -257,15 +629,102 @@ class MinesweeperAI:
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Should choose among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        The cell with the lowest probability of being a mine is chosen,
+        ties are broken randomly.
         """
-        for i in range(self.width):
-            for j in range(self.height):
-                if (i, j) not in self.mines and (i, j) not in self.moves_made:
-                    return (i, j)
-        return None
+        probabilities = self.mine_probabilities()
+        if not probabilities:
+            return None
+        lowest = min(probabilities.values())
+        best = [cell for cell, p in probabilities.items() if p <= lowest + 1e-9]
+        return random.choice(sorted(best))
+
+    def mine_probabilities(self):
+        """
+        Returns a dictionary mapping every unknown cell (not chosen and not
+        known to be a mine) to the probability that it is a mine.
+
+        The frontier cells (cells mentioned by some sentence) are split into
+        independent components, the consistent mine configurations of each
+        component are enumerated, and the configurations are weighted by the
+        number of ways the remaining mines fit in the unconstrained cells.
+        """
+        unknown = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.mines and (i, j) not in self.moves_made
+        ]
+        if not unknown:
+            return {}
+
+        # Cells already known to be safe need no guessing
+        probabilities = {cell: 0.0 for cell in unknown if cell in self.safes}
+        unknown = [cell for cell in unknown if cell not in self.safes]
+        if not unknown:
+            return probabilities
+
+        remaining = self.total_mines - len(self.mines)
+        components = frontier_components(self.knowledge, set(unknown))
+        frontier = set(cell for cells, constraints in components for cell in cells)
+        outside = len(unknown) - len(frontier)
+
+        # Mine configurations of each component, grouped by number of mines
+        results = [
+            count_configurations(cells, constraints, remaining)
+            for cells, constraints in components
+        ]
+        totals = [{k: weight for k, (weight, _) in r.items()} for r in results]
+
+        # Distribution of mines over all components except the i-th one
+        prefix = [{0: 1}]
+        for dist in totals:
+            prefix.append(convolve(prefix[-1], dist))
+        suffix = [{0: 1}]
+        for dist in reversed(totals):
+            suffix.append(convolve(suffix[-1], dist))
+        suffix.reverse()
+
+        def ways(mines):
+            """Number of ways to place `mines` in the unconstrained cells."""
+            if mines < 0 or mines > outside:
+                return 0
+            return math.comb(outside, mines)
+
+        total = 0
+        expected_outside = 0
+        for k, weight in prefix[-1].items():
+            total += weight * ways(remaining - k)
+            expected_outside += weight * ways(remaining - k) * (remaining - k)
+
+        # Knowledge contradicts the mine count, or sampling found no consistent
+        # configuration of some component: every cell looks the same
+        if total == 0:
+            for cell in unknown:
+                probabilities[cell] = 0.5
+            return probabilities
+
+        for index, (cells, _) in enumerate(components):
+            others = convolve(prefix[index], suffix[index + 1])
+            for k, (weight, cell_counts) in results[index].items():
+                factor = sum(w * ways(remaining - k - m) for m, w in others.items())
+                if factor == 0:
+                    continue
+                for cell, count in zip(cells, cell_counts):
+                    probabilities[cell] = probabilities.get(cell, 0) + (count * factor)
+            for cell in cells:
+                probabilities[cell] = probabilities.get(cell, 0) / total
+
+        if outside:
+            p = expected_outside / total / outside
+            for cell in unknown:
+                if cell not in frontier:
+                    probabilities[cell] = p
+        return probabilities
 
     def update_safe(self, cells):
         cells = list(cells)
@@ -292,3 +751,201 @@ class MinesweeperAI:
                     elif (i, j) not in self.moves_made and (i, j) not in self.safes:
                         neighbours.append((i, j))
         return neighbours, count
+
+
+def frontier_components(knowledge, unknown):
+    """
+    Splits the sentences in `knowledge` into independent components.
+    Returns a list of (cells, constraints) pairs where `cells` is a list of
+    frontier cells and `constraints` is a list of (indices, count) pairs
+    referring to positions in `cells`. Two cells belong to the same
+    component if they are connected through shared sentences.
+    """
+    parent = {}
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    sentences = set()
+    for sentence in knowledge:
+        cells = frozenset(cell for cell in sentence.cells if cell in unknown)
+        if cells:
+            sentences.add((cells, sentence.count))
+    sentences = sorted(sentences, key=lambda item: (sorted(item[0]), item[1]))
+
+    for cells, _ in sentences:
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        first = find(next(iter(cells)))
+        for cell in cells:
+            root = find(cell)
+            if root != first:
+                parent[root] = first
+
+    groups = {}
+    for cells, count in sentences:
+        groups.setdefault(find(next(iter(cells))), []).append((cells, count))
+
+    components = []
+    for group in groups.values():
+
+        # Order cells so that sentences are completed as early as possible
+        order = []
+        seen = set()
+        for cells, _ in group:
+            for cell in sorted(cells):
+                if cell not in seen:
+                    seen.add(cell)
+                    order.append(cell)
+        index = {cell: i for i, cell in enumerate(order)}
+        constraints = [
+            ([index[cell] for cell in cells], count) for cells, count in group
+        ]
+        components.append((order, constraints))
+    return components
+
+
+def count_configurations(cells, constraints, max_mines):
+    """
+    Returns a dictionary mapping a number of mines `k` to a pair
+    (weight, cell_counts), where `weight` is the number of consistent
+    configurations of the component with exactly `k` mines and
+    `cell_counts[i]` is how many of those configurations have a mine at
+    `cells[i]`.
+
+    Components that need more than ENUMERATION_LIMIT search nodes are
+    estimated from SAMPLE_SIZE sampled configurations instead.
+    """
+    result = search_configurations(cells, constraints, max_mines, ENUMERATION_LIMIT)
+    if result is not None:
+        return result
+    return sample_configurations(cells, constraints, max_mines, SAMPLE_SIZE)
+
+
+def search_configurations(cells, constraints, max_mines, limit):
+    """
+    Depth first search over the mine configurations of a component.
+    All configurations are enumerated, and None is returned if more than
+    `limit` nodes are needed.
+    """
+    size = len(cells)
+    watching = [[] for _ in range(size)]
+    for c, (indices, _) in enumerate(constraints):
+        for i in indices:
+            watching[i].append(c)
+    needed = [count for _, count in constraints]
+    unassigned = [len(indices) for indices, _ in constraints]
+    assignment = [0] * size
+    result = {}
+    nodes = 0
+
+    def assign(i, value):
+        ok = True
+        for c in watching[i]:
+            needed[c] -= value
+            unassigned[c] -= 1
+            if needed[c] < 0 or needed[c] > unassigned[c]:
+                ok = False
+        return ok
+
+    def unassign(i, value):
+        for c in watching[i]:
+            needed[c] += value
+            unassigned[c] += 1
+
+    def search(i, mines):
+        nonlocal nodes
+        nodes += 1
+        if nodes > limit:
+            return False
+        if i == size:
+            weight, cell_counts = result.setdefault(mines, [0, [0] * size])
+            result[mines][0] = weight + 1
+            for j in range(size):
+                cell_counts[j] += assignment[j]
+            return True
+        for value in (0, 1):
+            if mines + value > max_mines:
+                continue
+            assignment[i] = value
+            if assign(i, value) and not search(i + 1, mines + value):
+                unassign(i, value)
+                assignment[i] = 0
+                return False
+            unassign(i, value)
+            assignment[i] = 0
+        return True
+
+    if not search(0, 0):
+        return None
+    return {k: (weight, counts) for k, (weight, counts) in result.items()}
+
+
+def sample_configurations(cells, constraints, max_mines, samples, rng=random):
+    """
+    Estimates the output of `search_configurations` from `samples` draws
+    of sequential importance sampling: cells are assigned in order, each
+    picking uniformly among the values that keep every sentence
+    satisfiable, and a completed configuration counts with weight
+    1 / (probability of drawing it), the product of the number of choices
+    made along the way. Draws that reach a dead end count with weight 0.
+
+    The weights are unbiased estimates of the configuration counts up to
+    the common factor `samples`, which cancels when they are normalized.
+    An empty dictionary means no consistent configuration was drawn.
+    """
+    size = len(cells)
+    watching = [[] for _ in range(size)]
+    for c, (indices, _) in enumerate(constraints):
+        for i in indices:
+            watching[i].append(c)
+
+    result = {}
+    for _ in range(samples):
+        needed = [count for _, count in constraints]
+        unassigned = [len(indices) for indices, _ in constraints]
+        assignment = [0] * size
+        mines = 0
+        weight = 1
+        for i in range(size):
+            choices = [
+                value
+                for value in (0, 1)
+                if mines + value <= max_mines
+                and all(
+                    0 <= needed[c] - value <= unassigned[c] - 1 for c in watching[i]
+                )
+            ]
+            if not choices:
+                weight = 0
+                break
+            value = rng.choice(choices)
+            weight *= len(choices)
+            for c in watching[i]:
+                needed[c] -= value
+                unassigned[c] -= 1
+            assignment[i] = value
+            mines += value
+        if weight == 0:
+            continue
+        total, cell_counts = result.setdefault(mines, [0, [0] * size])
+        result[mines][0] = total + weight
+        for j in range(size):
+            if assignment[j]:
+                cell_counts[j] += weight
+    return {k: (weight, counts) for k, (weight, counts) in result.items()}
+
+
+def convolve(a, b):
+    """
+    Combines two dictionaries mapping a number of mines to a weight into
+    the distribution of their sum.
+    """
+    result = {}
+    for i, x in a.items():
+        for j, y in b.items():
+            result[i + j] = result.get(i + j, 0) + x * y
+    return result
@@ -0,0 +1,145 @@
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Board configurations as (height, width, mines)
+CONFIGURATIONS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+}
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) < 2:
+        sys.exit(
+            "Usage: python simulate.py games [beginner|intermediate|expert|HxWxM ...]"
+        )
+
+    # Parse command-line arguments
+    games = parse_games(sys.argv[1])
+    names = sys.argv[2:] or list(CONFIGURATIONS)
+
+    for name in names:
+        height, width, mines = parse_configuration(name)
+        start = time.perf_counter()
+        results = simulate(height, width, mines, games)
+        elapsed = time.perf_counter() - start
+        report = summarize(results)
+
+        print(f"{name} ({height}x{width}, {mines} mines, n = {games})")
+        print(f"  Win rate: {report['win_rate']:.2%}")
+        print(f"  Average moves: {report['average_moves']:.1f}")
+        for key in ("p50", "p95", "p99"):
+            print(f"  Move time {key}: {report[key] * 1000:.3f} ms")
+        print(f"  Wall time: {elapsed:.2f} s")
+
+
+def parse_games(argument):
+    """
+    Return the number of games to play, which must be a positive integer.
+    """
+    try:
+        games = int(argument)
+    except ValueError:
+        sys.exit(f"Number of games must be a positive integer: {argument}")
+    if games < 1:
+        sys.exit(f"Number of games must be a positive integer: {argument}")
+    return games
+
+
+def parse_configuration(name):
+    """
+    Return (height, width, mines) for a named configuration,
+    or for a custom configuration written as HxWxM.
+    """
+    if name in CONFIGURATIONS:
+        return CONFIGURATIONS[name]
+    try:
+        height, width, mines = (int(value) for value in name.split("x"))
+    except ValueError:
+        sys.exit(f"Unknown configuration: {name}")
+    if mines >= height * width:
+        sys.exit(f"Too many mines for configuration: {name}")
+    return height, width, mines
+
+
+def simulate(height, width, mines, games, seed=0, workers=None):
+    """
+    Play `games` seeded games on a board of the given size across a
+    process pool. Return a list with the result of every game.
+    """
+    jobs = [(height, width, mines, seed + n) for n in range(games)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(play, *zip(*jobs), chunksize=max(1, games // 32)))
+
+
+def play(height, width, mines, seed):
+    """
+    Let the AI play one game seeded with `seed` until it hits a mine
+    or reveals every safe cell.
+    Return a dictionary with keys "won", "moves" and "times", where
+    "times" holds the seconds spent by the AI on each move.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+    safe_cells = height * width - mines
+
+    revealed = 0
+    times = []
+    won = False
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        times.append(time.perf_counter() - start)
+
+        if move is None or game.is_mine(move):
+            break
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        times[-1] += time.perf_counter() - start
+
+        revealed += 1
+        if revealed == safe_cells:
+            won = True
+            break
+
+    return {"won": won, "moves": len(times), "times": times}
+
+
+def summarize(results):
+    """
+    Return win rate, average number of moves and
+    p50/p95/p99 time per move over a list of game results.
+    """
+    times = sorted(t for result in results for t in result["times"])
+    return {
+        "win_rate": sum(result["won"] for result in results) / len(results),
+        "average_moves": sum(result["moves"] for result in results) / len(results),
+        "p50": percentile(times, 0.50),
+        "p95": percentile(times, 0.95),
+        "p99": percentile(times, 0.99),
+    }
+
+
+def percentile(values, q):
+    """
+    Return the `q` quantile of a sorted list of values (nearest rank).
+    """
+    if not values:
+        return 0
+    index = min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))
+    return values[index]
+
+
+if __name__ == "__main__":
+    main()
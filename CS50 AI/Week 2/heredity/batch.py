@@ -0,0 +1,199 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from heredity import load_data
+from jointree import JunctionTree
+from model import MODEL
+
+# Compiled junction trees of the models and family structures seen by this process
+MODELS = {}
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python batch.py families output.jsonl|npz [processes]")
+    processes = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    paths = family_paths(sys.argv[1])
+    results = run_batch(paths, processes)
+    if sys.argv[2].endswith(".npz"):
+        write_columns(sys.argv[2], results)
+    else:
+        write_jsonl(sys.argv[2], results)
+
+    failed = sum(1 for result in results if "error" in result)
+    seconds = sum(result["seconds"] for result in results)
+    print(f"{len(results) - failed} families inferred, {failed} failed")
+    print(f"  {seconds:.2f} s of inference")
+
+
+def family_paths(source):
+    """
+    Return the paths of the family CSV files in `source`, which is either
+    a directory of CSV files or a manifest file listing one path per line,
+    relative to the manifest's directory.
+    """
+    if os.path.isdir(source):
+        return [
+            os.path.join(source, filename)
+            for filename in sorted(os.listdir(source))
+            if filename.endswith(".csv")
+        ]
+    directory = os.path.dirname(source)
+    with open(source) as f:
+        return [os.path.join(directory, line.strip()) for line in f if line.strip()]
+
+
+def structure(people):
+    """
+    Return a key shared by all families with the same people in the same
+    order and the same parents, whatever their names and traits.
+    """
+    index = {name: i for i, name in enumerate(people)}
+    return tuple(
+        (
+            (index.get(data["mother"], -1), index.get(data["father"], -1))
+            if data["mother"] is not None and data["father"] is not None
+            else None
+        )
+        for data in people.values()
+    )
+
+
+def run_batch(paths, processes=None):
+    """
+    Infer every family in `paths` on a pool of `processes` worker processes
+    (in this process if `processes` is 1) and return the results in order.
+    """
+    if processes == 1:
+        return [infer_family(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(
+            executor.map(infer_family, paths, chunksize=max(1, len(paths) // 256))
+        )
+
+
+def infer_family(path):
+    """
+    Load the family in the CSV file at `path` and compute the gene and trait
+    distribution of every person, compiling a junction tree only for
+    structures this process has not seen before.
+
+    Return a dictionary with the path, the probabilities in the format
+    printed by `heredity.main`, whether a compiled model was reused, and the
+    time taken; or the path, an error message and the time taken if the
+    family is malformed or could not be inferred.
+    """
+    start = time.perf_counter()
+    try:
+        people = load_data(path)
+        problems = family_problems(people)
+        if problems:
+            raise ValueError("; ".join(problems))
+        probabilities, cached = infer_people(people)
+    except Exception as e:
+        return {
+            "family": path,
+            "error": f"{type(e).__name__}: {e}",
+            "seconds": time.perf_counter() - start,
+        }
+    return {
+        "family": path,
+        "probabilities": probabilities,
+        "cached": cached,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def family_problems(people):
+    """
+    Return a list of the structural problems of the family `people`, as
+    returned by `load_data`, that `Pedigree.from_csv` also rejects: parents
+    must both be given or both be blank, must be two different people
+    defined in the family, and no one may be their own parent.
+    """
+    problems = []
+    for person, data in people.items():
+        parents = [data["mother"], data["father"]]
+        if None in parents:
+            if parents != [None, None]:
+                problems.append(f"{person} has a single parent")
+        elif person in parents:
+            problems.append(f"{person} is their own parent")
+        elif parents[0] == parents[1]:
+            problems.append(f"{person} has the same mother and father")
+        else:
+            for parent in parents:
+                if parent not in people:
+                    problems.append(f"{parent} is a parent but is not defined")
+    return problems
+
+
+def infer_people(people, model=MODEL):
+    """
+    Return the gene and trait distribution of every person in `people`, as
+    returned by `load_data`, under `model`, and whether a compiled junction
+    tree was reused.
+    """
+    key = (model.key, structure(people))
+    cached = key in MODELS
+    if not cached:
+        MODELS[key] = JunctionTree(people, model)
+    tree = MODELS[key]
+
+    # The compiled tree may use the names of another family
+    names = dict(zip(people, tree.people))
+    evidence = {
+        names[person]: data["trait"]
+        for person, data in people.items()
+        if data["trait"] is not None
+    }
+    marginals = tree.marginals(evidence)
+    return {person: marginals[names[person]] for person in people}, cached
+
+
+def write_jsonl(path, results):
+    """
+    Write one JSON object per family result to `path`.
+    """
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+
+def write_columns(path, results):
+    """
+    Write the results to the NumPy archive at `path` as columns with one
+    entry per person (family, person, gene_0, gene_1, gene_2, trait,
+    seconds), and failed families as the columns failed and error.
+    """
+    rows = [
+        (result["family"], person, values, result["seconds"])
+        for result in results
+        if "error" not in result
+        for person, values in result["probabilities"].items()
+    ]
+    failures = [result for result in results if "error" in result]
+    np.savez(
+        path,
+        family=np.array([family for family, _, _, _ in rows], dtype=str),
+        person=np.array([person for _, person, _, _ in rows], dtype=str),
+        **{
+            f"gene_{g}": np.array([values["gene"][g] for _, _, values, _ in rows])
+            for g in range(3)
+        },
+        trait=np.array([values["trait"][True] for _, _, values, _ in rows]),
+        seconds=np.array([seconds for _, _, _, seconds in rows]),
+        failed=np.array([result["family"] for result in failures], dtype=str),
+        error=np.array([result["error"] for result in failures], dtype=str),
+    )
+
+
+if __name__ == "__main__":
+    main()
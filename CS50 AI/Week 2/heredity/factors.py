@@ -0,0 +1,290 @@
+import heapq
+import sys
+
+import numpy as np
+
+from heredity import load_data
+from model import MODEL
+
+# Number of values of each kind of variable: copies of the gene, and trait
+CARDINALITY = {"gene": 3, "trait": 2}
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python factors.py data.csv")
+    people = load_data(sys.argv[1])
+    print_marginals(people, marginals(people))
+
+
+def print_marginals(people, probabilities):
+    """
+    Print the gene and trait distribution of every person the same way
+    `heredity.main` does.
+    """
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+class Factor:
+    """
+    A table of non-negative values over a tuple of discrete variables.
+    Variables are (kind, person) pairs, where kind is "gene" or "trait";
+    `table` has one axis per variable, in the order of `variables`.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=np.float64)
+
+    def __repr__(self):
+        return f"Factor({self.variables})"
+
+    def __mul__(self, other):
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        return Factor(variables, self.expand(variables) * other.expand(variables))
+
+    def expand(self, variables):
+        """
+        Return the table with its axes ordered as in `variables`,
+        with axes of length 1 for variables not in this factor.
+        """
+        order = sorted(
+            range(len(self.variables)), key=lambda i: variables.index(self.variables[i])
+        )
+        table = self.table.transpose(order)
+        shape = [CARDINALITY[v[0]] if v in self.variables else 1 for v in variables]
+        return table.reshape(shape)
+
+    def sum_out(self, variable):
+        """
+        Return the factor with `variable` summed out.
+        """
+        axis = self.variables.index(variable)
+        return Factor(
+            self.variables[:axis] + self.variables[axis + 1 :],
+            self.table.sum(axis=axis),
+        )
+
+    def marginalize(self, variables):
+        """
+        Return the factor with every variable not in `variables` summed out.
+        """
+        axes = tuple(i for i, v in enumerate(self.variables) if v not in variables)
+        return Factor(
+            tuple(v for v in self.variables if v in variables),
+            self.table.sum(axis=axes),
+        )
+
+    def reduce(self, variable, value):
+        """
+        Return the factor restricted to `variable` taking the index `value`.
+        """
+        axis = self.variables.index(variable)
+        return Factor(
+            self.variables[:axis] + self.variables[axis + 1 :],
+            np.take(self.table, value, axis=axis),
+        )
+
+
+def compile_factors(people, model=MODEL):
+    """
+    Return the list of factors of the Bayesian network for `people`, as
+    returned by `load_data`: a gene prior for every person without parents,
+    an inheritance factor for every person with both parents, and a trait
+    factor for every person, reduced to the observed trait when known.
+    """
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    factors = []
+    for person, data in people.items():
+        gene = ("gene", person)
+        if data["mother"] is not None and data["father"] is not None:
+            factors.append(
+                Factor(
+                    (("gene", data["mother"]), ("gene", data["father"]), gene),
+                    inheritance,
+                )
+            )
+        else:
+            factors.append(Factor((gene,), prior))
+
+        factor = Factor((gene, ("trait", person)), trait)
+        if data["trait"] is not None:
+            factor = factor.reduce(("trait", person), int(data["trait"]))
+        factors.append(factor)
+    return factors
+
+
+def min_fill_order(factors, keep=()):
+    """
+    Return an order in which to eliminate every variable of `factors`
+    except those in `keep`, greedily choosing the variable whose
+    elimination adds the fewest new edges between its neighbours.
+    Scores are only recomputed for the variables an elimination touches.
+    """
+    neighbours = {}
+    for factor in factors:
+        for v in factor.variables:
+            neighbours.setdefault(v, set()).update(factor.variables)
+    for v in neighbours:
+        neighbours[v].discard(v)
+
+    def score(v):
+        near = list(neighbours[v])
+        fill = sum(
+            1
+            for i in range(len(near))
+            for j in range(i + 1, len(near))
+            if near[j] not in neighbours[near[i]]
+        )
+        return (fill, len(near), v)
+
+    remaining = set(neighbours) - set(keep)
+    scores = {v: score(v) for v in remaining}
+    heap = list(scores.values())
+    heapq.heapify(heap)
+    order = []
+    while remaining:
+        entry = heapq.heappop(heap)
+        v = entry[2]
+        if v not in remaining or scores[v] != entry:
+            continue
+        near = neighbours.pop(v)
+        for a in near:
+            neighbours[a].discard(v)
+            neighbours[a].update(near - {a})
+        remaining.remove(v)
+        order.append(v)
+
+        # Only the neighbours of `v` and theirs can gain neighbours or fill
+        touched = set(near)
+        for a in near:
+            touched.update(neighbours[a])
+        for u in touched & remaining:
+            new = score(u)
+            if new != scores[u]:
+                scores[u] = new
+                heapq.heappush(heap, new)
+    return order
+
+
+def variable_elimination(factors, query):
+    """
+    Return the normalized distribution of the variable `query`, as an array
+    indexed by its value, by summing every other variable out of the
+    product of `factors` in min-fill order.
+    """
+    factors = list(factors)
+    for v in min_fill_order(factors, keep=(query,)):
+        related = [f for f in factors if v in f.variables]
+        factors = [f for f in factors if v not in f.variables]
+        product = related[0]
+        for f in related[1:]:
+            product = product * f
+        factors.append(product.sum_out(v))
+
+    result = Factor((query,), np.ones(CARDINALITY[query[0]]))
+    for f in factors:
+        result = result * f
+    table = result.expand((query,))
+    return table / table.sum()
+
+
+def bucket_beliefs(factors):
+    """
+    Return the belief of the bucket of every variable of `factors`, the
+    product of all factors marginalized to the variables it shared when
+    it was eliminated, up to a constant.
+
+    Variables are eliminated once in min-fill order, each sending its
+    summed-out bucket to the bucket of the next of its variables to be
+    eliminated; messages are then passed back down the same tree, so all
+    beliefs cost two passes over the buckets.
+    """
+    order = min_fill_order(factors)
+    position = {v: i for i, v in enumerate(order)}
+
+    # Every factor goes to the bucket of its first variable to be eliminated
+    potentials = {v: Factor((), 1.0) for v in order}
+    for factor in factors:
+        if factor.variables:
+            v = min(factor.variables, key=position.get)
+            potentials[v] = potentials[v] * factor
+
+    up = {}
+    parent = {}
+    children = {v: [] for v in order}
+    for v in order:
+        product = potentials[v]
+        for c in children[v]:
+            product = product * up[c]
+        message = product.sum_out(v)
+        up[v] = Factor(message.variables, message.table / message.table.sum())
+        if message.variables:
+            parent[v] = min(message.variables, key=position.get)
+            children[parent[v]].append(v)
+
+    down = {}
+    beliefs = {}
+    for v in reversed(order):
+        incoming = [up[c] for c in children[v]]
+        if v in down:
+            incoming.append(down[v])
+        belief = potentials[v]
+        for message in incoming:
+            belief = belief * message
+        beliefs[v] = belief
+        for k, c in enumerate(children[v]):
+            product = potentials[v]
+            for message in incoming[:k] + incoming[k + 1 :]:
+                product = product * message
+            message = product.marginalize(up[c].variables)
+            down[c] = Factor(message.variables, message.table / message.table.sum())
+    return beliefs
+
+
+def marginals(people, model=MODEL):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    in the same format as the probabilities printed by `heredity.main`.
+    Observed traits are returned as certain.
+    """
+    beliefs = bucket_beliefs(compile_factors(people, model))
+
+    def belief(variable):
+        table = beliefs[variable].marginalize((variable,)).table
+        return table / table.sum()
+
+    probabilities = {}
+    for person, data in people.items():
+        gene = belief(("gene", person))
+        if data["trait"] is None:
+            trait = belief(("trait", person))
+        else:
+            trait = np.eye(2)[int(data["trait"])]
+        probabilities[person] = distribution(gene, trait)
+    return probabilities
+
+
+def distribution(gene, trait):
+    """
+    Return the gene and trait distribution arrays of a person as a
+    dictionary in the format used by `heredity.main`.
+    """
+    return {
+        "gene": {2: float(gene[2]), 1: float(gene[1]), 0: float(gene[0])},
+        "trait": {True: float(trait[1]), False: float(trait[0])},
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -26,36 +26,7 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
-        for person in people
-    }
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (
-                people[person]["trait"] is not None
-                and people[person]["trait"] != (person in have_trait)
-            )
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    probabilities = enumerate_probabilities(people)
 
     # Print results
     for person in people:
@@ -67,6 +38,82 @@ def main():
                 print(f"    {value}: {p:.4f}")
 
 
+def enumerate_probabilities(people, probs=PROBS):
+    """
+    Return the gene and trait distribution of every person by exact
+    enumeration under the parameters `probs`, in the same format as
+    computed by `main`.
+
+    Gene assignments are generated lazily, one tuple of gene counts at a
+    time, so memory use does not grow with the number of assignments.
+    Observed traits are fixed up front, and unknown traits are summed out
+    with the trait table instead of being enumerated.
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    parents = [
+        (
+            (index[people[name]["mother"]], index[people[name]["father"]])
+            if has_parent(name, people)
+            else None
+        )
+        for name in names
+    ]
+    evidence = [people[name]["trait"] for name in names]
+    prior = probs["gene"]
+    inheritance = inheritance_probabilities(probs)
+    trait = probs["trait"]
+
+    gene_totals = [[0, 0, 0] for _ in names]
+    trait_totals = [[0, 0] for _ in names]
+    for genes in itertools.product(range(3), repeat=len(names)):
+        p = 1
+        for i, g in enumerate(genes):
+            if parents[i] is None:
+                p *= prior[g]
+            else:
+                p *= inheritance[genes[parents[i][0]]][genes[parents[i][1]]][g]
+            if evidence[i] is not None:
+                p *= trait[g][evidence[i]]
+            if p == 0:
+                break
+        if p == 0:
+            continue
+        for i, g in enumerate(genes):
+            gene_totals[i][g] += p
+            if evidence[i] is None:
+                trait_totals[i][True] += p * trait[g][True]
+                trait_totals[i][False] += p * trait[g][False]
+            else:
+                trait_totals[i][evidence[i]] += p
+
+    probabilities = {
+        name: {
+            "gene": {2: gene_totals[i][2], 1: gene_totals[i][1], 0: gene_totals[i][0]},
+            "trait": {True: trait_totals[i][True], False: trait_totals[i][False]},
+        }
+        for i, name in enumerate(names)
+    }
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def inheritance_probabilities(probs=PROBS):
+    """
+    Return a nested list where entry [mother][father][child] is the
+    probability of the child having that many copies of the gene
+    given the number of copies of each parent.
+    """
+    # Probability of passing the gene on, by number of copies held
+    passing = [probs["mutation"], 0.5, 1 - probs["mutation"]]
+    return [
+        [[(1 - m) * (1 - f), m * (1 - f) + f * (1 - m), m * f] for f in passing]
+        for m in passing
+    ]
+
+
 def load_data(filename):
     """
     Load gene and trait data from a file into a dictionary.
@@ -0,0 +1,208 @@
+import sys
+
+import numpy as np
+
+from factors import (
+    Factor,
+    compile_factors,
+    distribution,
+    min_fill_order,
+    print_marginals,
+)
+from heredity import load_data
+from model import MODEL
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python jointree.py data.csv")
+    people = load_data(sys.argv[1])
+    tree = JunctionTree(people)
+    print_marginals(people, tree.marginals())
+
+
+class JunctionTree:
+    """
+    Clique tree of the Bayesian network of a family, compiled once so that
+    the marginals for any set of trait evidence cost one calibration pass.
+    """
+
+    def __init__(self, people, model=MODEL):
+        """
+        Compile the family `people`, as returned by `load_data`, with the
+        tables of `model`.
+        The trait column of `people` is the default evidence.
+        """
+        self.people = people
+        self.evidence = {
+            person: data["trait"]
+            for person, data in people.items()
+            if data["trait"] is not None
+        }
+
+        # Compile without evidence, so evidence can be changed later
+        self.unobserved = {
+            person: dict(data, trait=None) for person, data in people.items()
+        }
+        factors = compile_factors(self.unobserved, model)
+        self.cliques = elimination_cliques(factors, min_fill_order(factors))
+        self.neighbours = spanning_tree(self.cliques)
+        self.use_model(model)
+
+        # Order cliques so that every clique comes after its parent
+        self.order = []
+        self.parent = {}
+        for root in range(len(self.cliques)):
+            if root in self.parent:
+                continue
+            self.parent[root] = None
+            stack = [root]
+            while stack:
+                i = stack.pop()
+                self.order.append(i)
+                for j in self.neighbours[i]:
+                    if j not in self.parent:
+                        self.parent[j] = i
+                        stack.append(j)
+
+    def use_model(self, model):
+        """
+        Rebuild the clique potentials from the tables of `model`,
+        keeping the cliques and the shape of the tree.
+        """
+        self.potentials = [Factor((), 1.0) for _ in self.cliques]
+
+        # Multiply every factor into a clique that covers its variables
+        for factor in compile_factors(self.unobserved, model):
+            i = self.covering(factor.variables)
+            self.potentials[i] = self.potentials[i] * factor
+
+    def covering(self, variables):
+        """
+        Return the index of the smallest clique containing all of `variables`.
+        """
+        return min(
+            (i for i, clique in enumerate(self.cliques) if clique >= set(variables)),
+            key=lambda i: len(self.cliques[i]),
+        )
+
+    def calibrate(self, evidence=None):
+        """
+        Pass messages towards the roots and back out again with the trait
+        evidence `evidence`, a dictionary mapping people to True or False
+        (by default the traits given when the tree was built).
+        Return the belief of every clique.
+        """
+        if evidence is None:
+            evidence = self.evidence
+        potentials = list(self.potentials)
+        for person, trait in evidence.items():
+            variable = ("trait", person)
+            i = self.covering((variable,))
+            potentials[i] = potentials[i] * Factor((variable,), np.eye(2)[int(trait)])
+
+        messages = {}
+
+        def send(i, j):
+            message = potentials[i]
+            for k in self.neighbours[i]:
+                if k != j:
+                    message = message * messages[k, i]
+            message = message.marginalize(self.cliques[i] & self.cliques[j])
+            messages[i, j] = Factor(
+                message.variables, message.table / message.table.sum()
+            )
+
+        for i in reversed(self.order):
+            if self.parent[i] is not None:
+                send(i, self.parent[i])
+        for i in self.order:
+            for j in self.neighbours[i]:
+                if j != self.parent[i]:
+                    send(i, j)
+
+        beliefs = []
+        for i, potential in enumerate(potentials):
+            for k in self.neighbours[i]:
+                potential = potential * messages[k, i]
+            beliefs.append(potential)
+        return beliefs
+
+    def marginals(self, evidence=None):
+        """
+        Return the gene and trait distribution of every person given the
+        trait evidence `evidence`, in the format printed by `heredity.main`.
+        """
+        beliefs = self.calibrate(evidence)
+        probabilities = {}
+        for person in self.people:
+            values = []
+            for variable in (("gene", person), ("trait", person)):
+                belief = beliefs[self.covering((variable,))].marginalize((variable,))
+                values.append(belief.table / belief.table.sum())
+            probabilities[person] = distribution(*values)
+        return probabilities
+
+
+def elimination_cliques(factors, order):
+    """
+    Return the maximal cliques, as sets of variables, formed by eliminating
+    the variables of `factors` in `order`.
+    """
+    neighbours = {}
+    for factor in factors:
+        for v in factor.variables:
+            neighbours.setdefault(v, set()).update(factor.variables)
+
+    cliques = []
+    for v in order:
+        clique = neighbours.pop(v)
+        for a in clique - {v}:
+            neighbours[a].update(clique)
+            neighbours[a].discard(v)
+        if not any(clique <= other for other in cliques):
+            cliques.append(clique)
+    return cliques
+
+
+def spanning_tree(cliques):
+    """
+    Join `cliques` into a tree that maximizes the total number of variables
+    shared by neighbouring cliques, which gives the running intersection
+    property for cliques formed by elimination.
+    Return the list of neighbours of every clique.
+    """
+    containing = {}
+    for i, clique in enumerate(cliques):
+        for v in clique:
+            containing.setdefault(v, []).append(i)
+    edges = set()
+    for indices in containing.values():
+        for a in indices:
+            for b in indices:
+                if a < b:
+                    edges.add((a, b))
+
+    # Kruskal's algorithm, largest separators first
+    component = list(range(len(cliques)))
+
+    def find(i):
+        while component[i] != i:
+            component[i] = component[component[i]]
+            i = component[i]
+        return i
+
+    neighbours = [[] for _ in cliques]
+    for a, b in sorted(edges, key=lambda e: (-len(cliques[e[0]] & cliques[e[1]]), e)):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            component[ra] = rb
+            neighbours[a].append(b)
+            neighbours[b].append(a)
+    return neighbours
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+
+from heredity import PROBS, inheritance_probabilities
+
+# Models already built, keyed by their parameters
+CACHE = {}
+
+
+class Model:
+    """
+    Conditional probability tables of the heredity model for one setting of
+    its parameters, computed once:
+
+        * `prior[g]`, the probability of a person without parents
+          having `g` copies of the gene,
+        * `inheritance[m, f, c]`, the probability of a child having `c`
+          copies given `m` copies for the mother and `f` for the father,
+        * `trait[g, t]`, the probability of having the trait (t = 1) or not
+          (t = 0) given `g` copies,
+
+    and the logarithms of each.
+    """
+
+    def __init__(self, gene=None, trait=None, mutation=None):
+        """
+        Build the tables from a gene prior and a trait table in the format
+        of `PROBS["gene"]` and `PROBS["trait"]`, and a mutation probability.
+        Parameters not given are taken from `PROBS`.
+        """
+        gene = PROBS["gene"] if gene is None else gene
+        trait = PROBS["trait"] if trait is None else trait
+        mutation = PROBS["mutation"] if mutation is None else mutation
+        self.probs = {"gene": gene, "trait": trait, "mutation": mutation}
+        self.key = parameters(self.probs)
+
+        self.prior = np.array([gene[g] for g in range(3)], dtype=np.float64)
+        self.trait = np.array(
+            [[trait[g][False], trait[g][True]] for g in range(3)], dtype=np.float64
+        )
+        self.inheritance = np.array(inheritance_probabilities(self.probs))
+        if not 0 <= mutation <= 1:
+            raise ValueError(f"mutation probability {mutation} is not in [0, 1]")
+        for name, table in [("gene", self.prior), ("trait", self.trait)]:
+            if (table < 0).any() or not np.allclose(table.sum(axis=-1), 1):
+                raise ValueError(f"{name} probabilities do not sum to 1")
+
+        with np.errstate(divide="ignore"):
+            self.log_prior = np.log(self.prior)
+            self.log_inheritance = np.log(self.inheritance)
+            self.log_trait = np.log(self.trait)
+
+    def __repr__(self):
+        return f"Model({self.probs})"
+
+    @classmethod
+    def from_probs(cls, probs):
+        """
+        Return the model for a dictionary in the format of `PROBS`, reusing
+        the tables if a model with the same parameters was built before.
+        """
+        key = parameters(probs)
+        if key not in CACHE:
+            CACHE[key] = cls(probs["gene"], probs["trait"], probs["mutation"])
+        return CACHE[key]
+
+
+def parameters(probs):
+    """
+    Return the parameters of a dictionary in the format of `PROBS`
+    as a tuple that can be used as a dictionary key.
+    """
+    return (
+        tuple(float(probs["gene"][g]) for g in range(3)),
+        tuple(float(probs["trait"][g][True]) for g in range(3)),
+        tuple(float(probs["trait"][g][False]) for g in range(3)),
+        float(probs["mutation"]),
+    )
+
+
+# Model of the parameters in `PROBS`
+MODEL = Model.from_probs(PROBS)
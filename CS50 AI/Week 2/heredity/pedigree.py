@@ -0,0 +1,248 @@
+import csv
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch import infer_people
+from factors import print_marginals
+from model import MODEL
+
+# Number of problems listed in the error raised for an invalid pedigree
+REPORTED_PROBLEMS = 10
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python pedigree.py data.csv [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    pedigree = Pedigree.from_csv(sys.argv[1], strict=False)
+    for problem in pedigree.problems:
+        print(f"Warning: {problem}")
+
+    families = pedigree.families()
+    print(f"{len(pedigree)} people in {len(families)} families")
+    people, results = infer_families(pedigree, families, processes)
+    for family, result in zip(people, results):
+        if "error" in result:
+            print(f"Warning: family of {next(iter(family))}: {result['error']}")
+        else:
+            print_marginals(family, result["probabilities"])
+
+
+class Pedigree:
+    """
+    People indexed by integers, with the index of every person's mother
+    and father (-1 for founders) and a trait code of 1 or 0 if the trait
+    is known, -1 otherwise.
+    """
+
+    def __init__(self, names, mother, father, traits, problems=()):
+        self.names = names
+        self.mother = mother
+        self.father = father
+        self.traits = traits
+        self.problems = list(problems)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_csv(cls, filename, strict=True):
+        """
+        Read a pedigree from a CSV file with the fields of `load_data` one
+        row at a time, checking its structure on the way: names must be
+        unique, parents must both be given or both be blank, must be two
+        different people defined somewhere in the file, and no one may be
+        their own ancestor.
+
+        If `strict`, raise ValueError if there are any problems. Otherwise
+        people with a missing, single or repeated parent are kept as founders,
+        the same as `heredity.has_parent` treats them, and the problems are
+        recorded in `problems`. Cycles are always an error.
+        """
+        index = {}
+        names = []
+        defined = bytearray()
+        mother = array("q")
+        father = array("q")
+        traits = array("b")
+        problems = []
+
+        def lookup(name):
+            i = index.get(name)
+            if i is None:
+                i = index[name] = len(names)
+                names.append(name)
+                defined.append(0)
+                mother.append(-1)
+                father.append(-1)
+                traits.append(-1)
+            return i
+
+        with open(filename, newline="") as f:
+            reader = csv.DictReader(f)
+            missing = {"name", "mother", "father", "trait"} - set(
+                reader.fieldnames or []
+            )
+            if missing:
+                raise ValueError(f"{filename} is missing columns {sorted(missing)}")
+            for line, row in enumerate(reader, start=2):
+                i = lookup(row["name"])
+                if defined[i]:
+                    problems.append(f"line {line}: {row['name']} is defined twice")
+                    continue
+                defined[i] = 1
+                if row["trait"] in ("0", "1"):
+                    traits[i] = int(row["trait"])
+                elif row["trait"]:
+                    problems.append(
+                        f"line {line}: {row['name']} has trait {row['trait']!r}"
+                    )
+
+                if row["mother"] and row["father"]:
+                    if row["name"] in (row["mother"], row["father"]):
+                        problems.append(
+                            f"line {line}: {row['name']} is their own parent"
+                        )
+                    elif row["mother"] == row["father"]:
+                        problems.append(
+                            f"line {line}: {row['name']} has the same mother "
+                            "and father"
+                        )
+                    else:
+                        mother[i] = lookup(row["mother"])
+                        father[i] = lookup(row["father"])
+                elif row["mother"] or row["father"]:
+                    problems.append(f"line {line}: {row['name']} has a single parent")
+
+        mother = np.frombuffer(mother, dtype=np.int64).copy()
+        father = np.frombuffer(father, dtype=np.int64).copy()
+        traits = np.frombuffer(traits, dtype=np.int8).copy()
+
+        # Parents that were named but never given a row of their own
+        undefined = np.flatnonzero(np.frombuffer(defined, dtype=np.uint8) == 0)
+        for i in undefined:
+            problems.append(f"{names[i]} is a parent but is not defined")
+        if len(undefined):
+            orphan = np.isin(mother, undefined) | np.isin(father, undefined)
+            mother[orphan] = -1
+            father[orphan] = -1
+            keep = np.ones(len(names), dtype=bool)
+            keep[undefined] = False
+            position = np.cumsum(keep) - 1
+            names = [name for name, k in zip(names, keep) if k]
+            mother = np.where(mother < 0, -1, position[mother])[keep]
+            father = np.where(father < 0, -1, position[father])[keep]
+            traits = traits[keep]
+
+        pedigree = cls(names, mother, father, traits, problems)
+        if not pedigree.acyclic():
+            raise ValueError(f"{filename} has people who are their own ancestors")
+        if strict and problems:
+            listed = "; ".join(problems[:REPORTED_PROBLEMS])
+            raise ValueError(f"{filename} has {len(problems)} problems: {listed}")
+        return pedigree
+
+    def acyclic(self):
+        """
+        Tell whether no one is their own ancestor, by removing people
+        whose parents have all been removed, one generation at a time.
+        """
+        remaining = self.mother >= 0
+        while remaining.any():
+            ready = remaining & ~remaining[self.mother] & ~remaining[self.father]
+            if not ready.any():
+                return False
+            remaining &= ~ready
+        return True
+
+    def labels(self):
+        """
+        Return an array that gives every person the smallest index
+        of anyone they are related to through parent links.
+        """
+        labels = np.arange(len(self))
+        child = np.flatnonzero(self.mother >= 0)
+        while True:
+            old = labels.copy()
+            lowest = np.minimum(
+                labels[child],
+                np.minimum(labels[self.mother[child]], labels[self.father[child]]),
+            )
+            np.minimum.at(labels, child, lowest)
+            np.minimum.at(labels, self.mother[child], lowest)
+            np.minimum.at(labels, self.father[child], lowest)
+            labels = labels[labels]
+            if np.array_equal(labels, old):
+                return labels
+
+    def families(self):
+        """
+        Return a list of index arrays, one per group of people connected
+        through parent links, in order of their first person.
+        """
+        labels = self.labels()
+        order = np.argsort(labels, kind="stable")
+        bounds = np.flatnonzero(np.diff(labels[order])) + 1
+        return np.split(order, bounds) if len(order) else []
+
+    def people(self, indices):
+        """
+        Return the people at `indices` in the format of `heredity.load_data`.
+        """
+        names = self.names
+        return {
+            names[i]: {
+                "name": names[i],
+                "mother": names[self.mother[i]] if self.mother[i] >= 0 else None,
+                "father": names[self.father[i]] if self.father[i] >= 0 else None,
+                "trait": None if self.traits[i] < 0 else bool(self.traits[i]),
+            }
+            for i in indices.tolist()
+        }
+
+
+def infer_families(pedigree, families, processes=None, model=MODEL):
+    """
+    Infer every family of `pedigree`, given as index arrays, under `model`
+    on a pool of `processes` worker processes (in this process if
+    `processes` is 1).
+    Return the list of people of every family and the list of their
+    results, as returned by `infer_group`.
+    """
+    people = [pedigree.people(indices) for indices in families]
+    if processes == 1:
+        results = [infer_group(family, model) for family in people]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(
+                executor.map(
+                    infer_group,
+                    people,
+                    [model] * len(people),
+                    chunksize=max(1, len(people) // 256),
+                )
+            )
+    return people, results
+
+
+def infer_group(people, model=MODEL):
+    """
+    Return a dictionary with the probabilities of the family `people` under
+    `model` in the format printed by `heredity.main`, or with an error
+    message if the family could not be inferred, so that one bad family
+    does not stop the others.
+    """
+    try:
+        probabilities, _ = infer_people(people, model)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {"probabilities": probabilities}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from factors import distribution, print_marginals
+from heredity import load_data
+from model import MODEL
+from vectorized import encode
+
+# Effective sample size below which a chain's estimate is not trusted
+MINIMUM_CHAIN_ESS = 2
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python sampling.py data.csv [gibbs|weighting]")
+    people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) == 3 else "gibbs"
+    if method == "gibbs":
+        probabilities, diagnostics = gibbs_sampling(people)
+    elif method == "weighting":
+        probabilities, diagnostics = likelihood_weighting(people)
+    else:
+        sys.exit(f"Unknown method {method}")
+    print_marginals(people, probabilities)
+    for person, values in diagnostics.items():
+        print(f"{person}: " + ", ".join(f"{k} {v:.3f}" for k, v in values.items()))
+
+
+def topological_order(mother, father):
+    """
+    Return the indices of all people ordered so that parents come before
+    their children. Raise ValueError if someone is their own ancestor.
+    """
+    order = []
+    state = [0] * len(mother)
+    for start in range(len(mother)):
+        stack = [(start, False)]
+        while stack:
+            i, done = stack.pop()
+            if done:
+                state[i] = 2
+                order.append(i)
+                continue
+            if state[i] == 2:
+                continue
+            if state[i] == 1:
+                raise ValueError("pedigree contains a cycle")
+            state[i] = 1
+            stack.append((i, True))
+            for parent in (mother[i], father[i]):
+                if parent >= 0 and state[parent] != 2:
+                    stack.append((parent, False))
+    return order
+
+
+def run_chains(function, jobs, processes):
+    """
+    Run `function` on every tuple of arguments in `jobs`, on a process pool
+    unless `processes` is 1, and return the results in order.
+    """
+    if processes == 1:
+        return [function(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(function, *zip(*jobs)))
+
+
+def likelihood_weighting(
+    people, model=MODEL, samples=10000, chains=4, processes=1, seed=None
+):
+    """
+    Estimate the gene and trait distribution of every person by sampling
+    genes and unknown traits from the model, parents before children,
+    and weighting every sample by the probability of the known traits.
+    `chains` independent batches of `samples` samples run on `processes`
+    worker processes.
+
+    Return the probability dictionary in the format printed by
+    `heredity.main`, and for every person the effective sample size of the
+    weights ("ess") and the standard error of their expected number of
+    copies of the gene across chains ("error"), which is nan if any chain
+    has too few samples of real weight to estimate it.
+    """
+    names, mother, father, known = encode(people)
+    order = topological_order(mother, father)
+    streams = np.random.SeedSequence(seed).spawn(chains)
+    results = run_chains(
+        weighting_chain,
+        [(mother, father, known, order, model, samples, stream) for stream in streams],
+        processes,
+    )
+
+    log_weights = np.concatenate([w for w, _, _ in results])
+    genes = np.concatenate([g for _, g, _ in results])
+    traits = np.concatenate([t for _, _, t in results])
+    weights = normalized_weights(log_weights)
+    if weights is None:
+        raise ValueError("no sample is consistent with the evidence")
+    total = weights.sum()
+    ess = total**2 / (weights**2).sum()
+
+    # Spread of the per-chain estimates of the expected number of copies,
+    # unknown unless every chain has more than one sample of real weight
+    means = []
+    for w, g, _ in results:
+        w = normalized_weights(w)
+        if w is None or w.sum() ** 2 / (w**2).sum() < MINIMUM_CHAIN_ESS:
+            means = None
+            break
+        means.append(w @ g / w.sum())
+    if means is None or chains == 1:
+        error = np.full(len(names), np.nan)
+    else:
+        error = np.std(means, axis=0, ddof=1) / np.sqrt(chains)
+
+    probabilities = {}
+    for i, name in enumerate(names):
+        gene = [weights @ (genes[:, i] == g) / total for g in range(3)]
+        trait = [weights @ (traits[:, i] == t) / total for t in range(2)]
+        probabilities[name] = distribution(gene, trait)
+    diagnostics = {
+        name: {"ess": float(ess), "error": float(error[i])}
+        for i, name in enumerate(names)
+    }
+    return probabilities, diagnostics
+
+
+def weighting_chain(mother, father, known, order, model, samples, stream):
+    """
+    Draw `samples` weighted samples from the random stream `stream`.
+    Return the log weights and the sampled genes and traits, one row per
+    sample; the weights are kept in log space so that they do not underflow
+    in large pedigrees.
+    """
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    rng = np.random.default_rng(stream)
+    n = len(mother)
+    genes = np.zeros((samples, n), dtype=np.int8)
+    traits = np.zeros((samples, n), dtype=np.int8)
+    log_weights = np.zeros(samples)
+    for i in order:
+        if mother[i] < 0:
+            p = np.broadcast_to(prior, (samples, 3))
+        else:
+            p = inheritance[genes[:, mother[i]], genes[:, father[i]]]
+        genes[:, i] = (rng.random((samples, 1)) > p.cumsum(axis=1)).sum(axis=1)
+        if known[i] < 0:
+            traits[:, i] = rng.random(samples) < trait[genes[:, i], 1]
+        else:
+            traits[:, i] = known[i]
+            log_weights += model.log_trait[genes[:, i], known[i]]
+    return log_weights, genes, traits
+
+
+def normalized_weights(log_weights):
+    """
+    Return the weights for `log_weights` relative to the largest of them,
+    or None if every weight is zero.
+    """
+    peak = log_weights.max()
+    if peak == -np.inf:
+        return None
+    return np.exp(log_weights - peak)
+
+
+def gibbs_sampling(
+    people,
+    model=MODEL,
+    samples=1000,
+    burn_in=200,
+    thin=1,
+    chains=4,
+    processes=1,
+    seed=None,
+):
+    """
+    Estimate the gene and trait distribution of every person by Gibbs
+    sampling the genes of one person at a time given everyone else's.
+    Unknown traits are summed out, so the trait distribution of a person
+    is the average of P(trait | genes) over the samples.
+
+    Every one of `chains` chains, run on `processes` worker processes,
+    discards `burn_in` sweeps and then keeps `samples` samples, one every
+    `thin` sweeps.
+
+    Return the probability dictionary in the format printed by
+    `heredity.main`, and for every person the effective sample size
+    ("ess") and the potential scale reduction factor ("r_hat") of their
+    number of copies of the gene.
+    """
+    names, mother, father, known = encode(people)
+    streams = np.random.SeedSequence(seed).spawn(chains)
+    jobs = [
+        (mother, father, known, model, samples, burn_in, thin, stream)
+        for stream in streams
+    ]
+    traces = np.array(run_chains(gibbs_chain, jobs, processes))
+    trait = model.trait
+
+    probabilities = {}
+    diagnostics = {}
+    for i, name in enumerate(names):
+        trace = traces[:, :, i]
+        gene = [np.mean(trace == g) for g in range(3)]
+        if known[i] < 0:
+            have = trait[trace, 1].mean()
+        else:
+            have = float(known[i])
+        probabilities[name] = distribution(gene, [1 - have, have])
+        diagnostics[name] = {
+            "ess": effective_sample_size(trace),
+            "r_hat": potential_scale_reduction(trace),
+        }
+    return probabilities, diagnostics
+
+
+def gibbs_chain(mother, father, known, model, samples, burn_in, thin, stream):
+    """
+    Run one Gibbs chain drawing from the random stream `stream` and return
+    the kept samples of the genes of every person, one row per sample.
+    """
+    prior, inheritance, trait = model.prior, model.inheritance, model.trait
+    rng = np.random.default_rng(stream)
+    n = len(mother)
+
+    # Plain lists make the many single-element lookups much cheaper
+    mother = mother.tolist()
+    father = father.tolist()
+    prior = prior.tolist()
+    inheritance = inheritance.tolist()
+    evidence = [
+        [1.0] * 3 if t < 0 else [trait[g, t] for g in range(3)] for t in known.tolist()
+    ]
+    children = [[] for _ in range(n)]
+    for c in range(n):
+        if mother[c] >= 0:
+            children[mother[c]].append(c)
+            children[father[c]].append(c)
+
+    genes = rng.integers(3, size=n).tolist()
+    sweeps = burn_in + samples * thin
+    trace = np.zeros((samples, n), dtype=np.int8)
+    for sweep in range(sweeps):
+        draws = rng.random(n).tolist()
+        for i in range(n):
+            weights = []
+            for g in range(3):
+                if mother[i] < 0:
+                    w = prior[g]
+                else:
+                    w = inheritance[genes[mother[i]]][genes[father[i]]][g]
+                w *= evidence[i][g]
+                genes[i] = g
+                for c in children[i]:
+                    w *= inheritance[genes[mother[c]]][genes[father[c]]][genes[c]]
+                weights.append(w)
+            r = draws[i] * (weights[0] + weights[1] + weights[2])
+            genes[i] = 0 if r < weights[0] else 1 if r < weights[0] + weights[1] else 2
+        kept = sweep - burn_in
+        if kept >= 0 and kept % thin == 0:
+            trace[kept // thin] = genes
+    return trace
+
+
+def effective_sample_size(trace):
+    """
+    Return the effective sample size of `trace`, an array with one row of
+    samples per chain, from the autocorrelation averaged over chains,
+    summed until the sum of two consecutive lags turns negative.
+    """
+    chains, samples = trace.shape
+    centered = trace - trace.mean(axis=1, keepdims=True)
+    variance = (centered**2).mean()
+    if variance == 0:
+        return float(chains * samples)
+
+    # Autocorrelation of every chain by FFT, zero padded to avoid wrapping
+    spectrum = np.fft.rfft(centered, n=2 * samples, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), axis=1)[:, :samples]
+    rho = autocovariance.mean(axis=0) / samples / variance
+
+    total = 0
+    for lag in range(1, samples - 1, 2):
+        pair = rho[lag] + rho[lag + 1]
+        if pair < 0:
+            break
+        total += pair
+    return float(chains * samples / (1 + 2 * total))
+
+
+def potential_scale_reduction(trace):
+    """
+    Return the Gelman-Rubin statistic of `trace`, an array with one row of
+    samples per chain. Values close to 1 mean the chains agree.
+    """
+    chains, samples = trace.shape
+    if chains < 2:
+        return float("nan")
+    within = trace.var(axis=1, ddof=1).mean()
+    between = samples * trace.mean(axis=1).var(ddof=1)
+    if within == 0:
+        return 1.0 if between == 0 else float("inf")
+    pooled = (samples - 1) / samples * within + between / samples
+    return float(np.sqrt(pooled / within))
+
+
+if __name__ == "__main__":
+    main()
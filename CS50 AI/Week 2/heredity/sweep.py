@@ -0,0 +1,243 @@
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from factors import distribution
+from heredity import PROBS, load_data
+from jointree import JunctionTree
+from model import Model
+from vectorized import encode
+
+# Largest number of gene assignments scored in one vectorized pass;
+# larger families are swept with a junction tree instead
+ENUMERATION_LIMIT = 3**10
+
+# Number of parameter points scored together in a vectorized pass
+POINTS = 64
+
+# Parameters that can be swept: the mutation probability, the probability
+# of the trait given 0, 1 or 2 copies, and the prior of 1 or 2 copies
+# (the prior of 0 copies takes up the rest)
+PARAMETERS = ["mutation", "trait0", "trait1", "trait2", "gene1", "gene2"]
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) < 4:
+        sys.exit("Usage: python sweep.py data.csv output.csv name=start:stop:count ...")
+    people = load_data(sys.argv[1])
+    ranges = {}
+    for argument in sys.argv[3:]:
+        name, _, values = argument.partition("=")
+        if name not in PARAMETERS:
+            sys.exit(f"Unknown parameter {name}, expected one of {PARAMETERS}")
+        try:
+            start, stop, count = values.split(":")
+            ranges[name] = np.linspace(float(start), float(stop), int(count))
+        except ValueError:
+            sys.exit(f"Expected {name}=start:stop:count, got {argument}")
+    try:
+        check_ranges(ranges)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    models = grid(ranges)
+    results = sweep(people, models)
+    write_table(sys.argv[2], table(models, results))
+    print(f"{len(models)} parameter points swept")
+
+
+def check_ranges(ranges):
+    """
+    Raise ValueError unless every value in `ranges`, in the format taken by
+    `grid`, is a probability and every combination of the gene priors
+    leaves a prior of 0 copies of at least 0.
+    """
+    for name, values in ranges.items():
+        if len(values) == 0:
+            raise ValueError(f"{name} has no values")
+        if not 0 <= min(values) <= max(values) <= 1:
+            raise ValueError(f"{name} values are not all in [0, 1]")
+    largest = sum(
+        max(ranges[f"gene{g}"]) if f"gene{g}" in ranges else PROBS["gene"][g]
+        for g in [1, 2]
+    )
+    if largest > 1 + 1e-9:
+        raise ValueError(f"gene1 + gene2 reaches {largest:g}, more than 1")
+
+
+def grid(ranges):
+    """
+    Return a list of models, one for every combination of the values in
+    `ranges`, a dictionary mapping names in PARAMETERS to sequences of
+    values. Parameters not in `ranges` keep their values from `PROBS`.
+    Check the values with `check_ranges` first.
+    """
+    names = list(ranges)
+    models = []
+    for values in itertools.product(*ranges.values()):
+        point = dict(zip(names, values))
+        gene = dict(PROBS["gene"])
+        for g in [1, 2]:
+            gene[g] = point.get(f"gene{g}", gene[g])
+        gene[0] = max(0.0, 1 - gene[1] - gene[2])
+        trait = {}
+        for g in range(3):
+            p = point.get(f"trait{g}", PROBS["trait"][g][True])
+            trait[g] = {True: p, False: 1 - p}
+        mutation = point.get("mutation", PROBS["mutation"])
+
+        # Built directly, so sweeps do not fill the shared model cache
+        models.append(Model(gene, trait, mutation))
+    return models
+
+
+def sweep(people, models, processes=None):
+    """
+    Return the gene and trait distribution of every person in `people` under
+    every model in `models`, as a list with one probability dictionary in
+    the format printed by `heredity.main` per model.
+
+    Small families are enumerated once and scored for many models at a
+    time; larger ones are compiled into one junction tree and the models
+    are spread over `processes` worker processes.
+    """
+    if 3 ** len(people) <= ENUMERATION_LIMIT:
+        return enumeration_sweep(people, models)
+
+    tree = JunctionTree(people, models[0])
+    chunks = np.array_split(np.arange(len(models)), processes or os.cpu_count())
+    jobs = [[models[k] for k in chunk] for chunk in chunks if len(chunk)]
+    if processes == 1 or len(jobs) == 1:
+        results = [tree_sweep(tree, job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(tree_sweep, [tree] * len(jobs), jobs))
+    return [probabilities for chunk in results for probabilities in chunk]
+
+
+def tree_sweep(tree, models):
+    """
+    Calibrate the junction tree `tree` under every model in `models`.
+    """
+    results = []
+    for model in models:
+        tree.use_model(model)
+        results.append(tree.marginals())
+    return results
+
+
+def statistics(people):
+    """
+    Enumerate every assignment of genes to `people` and return the gene
+    assignments, one row each, and how many times each entry of the gene
+    prior, the inheritance table and the trait table appears in the joint
+    probability of each assignment, one row each. Unknown traits sum out.
+    """
+    _, mother, father, known = encode(people)
+    n = len(people)
+    codes = np.arange(3**n, dtype=np.int64)
+    genes = (codes[:, None] // 3 ** np.arange(n)) % 3
+
+    def counts(cells, size):
+        return (cells[:, :, None] == np.arange(size)).sum(axis=1)
+
+    founder = mother < 0
+    child = ~founder
+    observed = known >= 0
+    inherited = (
+        genes[:, mother[child]] * 9 + genes[:, father[child]] * 3 + genes[:, child]
+    )
+    traits = genes[:, observed] * 2 + known[observed]
+    return genes, np.hstack(
+        [counts(genes[:, founder], 3), counts(inherited, 27), counts(traits, 6)]
+    )
+
+
+def enumeration_sweep(people, models, points=POINTS):
+    """
+    Return the probabilities of `people` under every model in `models`,
+    scoring all assignments for `points` models at a time: the log joint
+    probabilities are the product of the table counts of every assignment
+    with the log tables of every model.
+    Impossible entries count as the smallest positive float.
+    """
+    genes, counts = statistics(people)
+    n = len(people)
+    unknown = np.array([people[person]["trait"] is None for person in people])
+    tiny = np.finfo(np.float64).tiny
+    indicators = np.hstack([genes == g for g in range(3)]).astype(np.float64)
+
+    results = []
+    for first in range(0, len(models), points):
+        block = models[first : first + points]
+        tables = np.array(
+            [
+                np.log(
+                    np.maximum(
+                        np.concatenate(
+                            [m.prior, m.inheritance.ravel(), m.trait.ravel()]
+                        ),
+                        tiny,
+                    )
+                )
+                for m in block
+            ]
+        )
+        log_p = counts @ tables.T
+        weights = np.exp(log_p - log_p.max(axis=0))
+        totals = indicators.T @ weights / weights.sum(axis=0)
+        for k, model in enumerate(block):
+            gene = totals[:, k].reshape(3, n)
+            have = gene.T @ model.trait[:, 1]
+            probabilities = {}
+            for i, person in enumerate(people):
+                trait = people[person]["trait"]
+                p = have[i] if unknown[i] else float(trait)
+                probabilities[person] = distribution(gene[:, i], [1 - p, p])
+            results.append(probabilities)
+    return results
+
+
+def table(models, results):
+    """
+    Return a list of rows, one per parameter point and person, with the
+    parameters of the point and the person's marginal probabilities.
+    """
+    rows = []
+    for point, (model, probabilities) in enumerate(zip(models, results)):
+        parameters = {
+            "point": point,
+            "mutation": model.probs["mutation"],
+            **{f"gene{g}": model.probs["gene"][g] for g in range(3)},
+            **{f"trait{g}": model.probs["trait"][g][True] for g in range(3)},
+        }
+        for person, values in probabilities.items():
+            rows.append(
+                {
+                    **parameters,
+                    "person": person,
+                    **{f"p_gene{g}": values["gene"][g] for g in range(3)},
+                    "p_trait": values["trait"][True],
+                }
+            )
+    return rows
+
+
+def write_table(filename, rows):
+    """
+    Write `rows`, a list of dictionaries with the same keys, to a CSV file.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import sys
+
+import numpy as np
+
+from factors import distribution, print_marginals
+from heredity import load_data
+from model import MODEL
+
+# Number of assignments scored at a time
+BATCH_SIZE = 1 << 16
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    print_marginals(people, enumerate_marginals(people))
+
+
+def encode(people):
+    """
+    Return the family `people`, as returned by `load_data`, as arrays:
+    the list of names, the index of every person's mother and father
+    (-1 for people without parents) and every person's trait
+    (1 or 0 if known, -1 otherwise).
+    """
+    names = list(people)
+    index = {name: i for i, name in enumerate(names)}
+    mother = np.array(
+        [index.get(people[name]["mother"], -1) for name in names], dtype=np.int64
+    )
+    father = np.array(
+        [index.get(people[name]["father"], -1) for name in names], dtype=np.int64
+    )
+
+    # Only people with both parents inherit, the same as `has_parent`
+    founder = (mother < 0) | (father < 0)
+    mother[founder] = -1
+    father[founder] = -1
+    traits = np.array(
+        [
+            -1 if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in names
+        ],
+        dtype=np.int64,
+    )
+    return names, mother, father, traits
+
+
+def log_joint_probability(mother, father, genes, traits, model=MODEL):
+    """
+    Return the log joint probability of every assignment in a batch, where
+    row `k` of `genes` gives the copies of the gene of every person and row
+    `k` of `traits` whether they have the trait (1) or not (0), under the
+    log tables of `model`.
+    """
+    prior, inheritance, trait = model.log_prior, model.log_inheritance, model.log_trait
+    founder = mother < 0
+    inherited = inheritance[genes[:, mother], genes[:, father], genes]
+    log_p = np.where(founder, prior[genes], inherited).sum(axis=1)
+    return log_p + trait[genes, traits].sum(axis=1)
+
+
+def enumerate_marginals(people, model=MODEL, batch_size=BATCH_SIZE):
+    """
+    Return the gene and trait distribution of every person by exact
+    enumeration, like `heredity.main`, but scoring assignments in batches.
+    Every assignment of genes and of the unknown traits is numbered, and
+    each batch of numbers is decoded into arrays and scored in log space.
+    """
+    names, mother, father, known = encode(people)
+    n = len(names)
+    unknown = np.flatnonzero(known < 0)
+    gene_powers = 3 ** np.arange(n, dtype=np.int64)
+    trait_powers = 2 ** np.arange(len(unknown), dtype=np.int64)
+    total = 3**n * 2 ** len(unknown)
+
+    # Weights are kept relative to the largest log probability seen so far
+    offset = -np.inf
+    genes_total = np.zeros((3, n))
+    traits_total = np.zeros((2, n))
+    for start in range(0, total, batch_size):
+        codes = np.arange(start, min(start + batch_size, total), dtype=np.int64)
+        genes = (codes[:, None] % 3**n) // gene_powers % 3
+        traits = np.broadcast_to(known, (len(codes), n)).copy()
+        traits[:, unknown] = (codes[:, None] // 3**n) // trait_powers % 2
+
+        log_p = log_joint_probability(mother, father, genes, traits, model)
+        peak = log_p.max()
+        if peak == -np.inf:
+            continue
+        if peak > offset:
+            genes_total *= np.exp(offset - peak)
+            traits_total *= np.exp(offset - peak)
+            offset = peak
+        weights = np.exp(log_p - offset)
+        for g in range(3):
+            genes_total[g] += weights @ (genes == g)
+        for t in range(2):
+            traits_total[t] += weights @ (traits == t)
+
+    normalizer = genes_total.sum(axis=0)
+    return {
+        name: distribution(
+            genes_total[:, i] / normalizer[i], traits_total[:, i] / normalizer[i]
+        )
+        for i, name in enumerate(names)
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import sys
+import time
+
+import numpy as np
+
+from crawler import crawl_cached
+from graph import LinkGraph
+from solvers import SOLVERS, power_iteration
+
+# Damping factors every solver is run at
+DAMPINGS = [0.85, 0.9, 0.95, 0.99]
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python benchmark.py corpus|pages")
+
+    # Crawl a corpus directory, or generate a random graph with that many pages
+    if sys.argv[1].isdigit():
+        graph = random_graph(int(sys.argv[1]))
+    else:
+        pages, sources, targets, _ = crawl_cached(sys.argv[1])
+        graph = LinkGraph.from_edges(pages, sources, targets)
+    print(f"{len(graph)} pages, {graph.edges} links")
+
+    for damping_factor, name, iterations, converged, seconds, error in benchmark(graph):
+        print(
+            f"  d = {damping_factor:.2f}  {name:<13} {iterations:>5} iterations"
+            f"  {seconds:8.3f} s  error {error:.1e}"
+            + ("" if converged else "  (did not converge)")
+        )
+
+
+def benchmark(graph, dampings=DAMPINGS, solvers=SOLVERS):
+    """
+    Run every solver on `graph` at every damping factor.
+    Return a list of (damping_factor, solver, iterations, converged,
+    seconds, error) tuples, where `error` is the L1 distance to a tightly
+    converged result.
+    """
+    results = []
+    for damping_factor in dampings:
+        reference, _, _ = power_iteration(
+            graph, damping_factor, tolerance=1e-13, max_iterations=100000
+        )
+        for name, solver in solvers.items():
+            start = time.perf_counter()
+            ranks, iterations, converged = solver(graph, damping_factor)
+            seconds = time.perf_counter() - start
+            error = np.abs(ranks - reference).sum()
+            results.append(
+                (damping_factor, name, iterations, converged, seconds, error)
+            )
+    return results
+
+
+def random_graph(pages, links=8, community=100, leak=0.02, seed=0):
+    """
+    Return a random graph with `pages` pages and about `links` links per
+    page. Pages form communities of `community` consecutive pages, and link
+    targets follow a heavy-tailed popularity distribution within the
+    source's community. A fraction `leak` of links moves to a neighbouring
+    community instead, so the communities form a ring that a random surfer
+    crosses slowly, and convergence slows down as the damping factor
+    approaches 1, as it does on real link graphs.
+    """
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(pages, size=links * pages)
+    first = sources - sources % community
+    size = np.minimum(community, pages - first)
+    targets = first + (rng.pareto(1.2, size=links * pages) * 10).astype(np.int64) % size
+
+    # Links between neighbouring communities
+    leaving = rng.random(links * pages) < leak
+    step = rng.choice([-community, community], size=links * pages)
+    targets[leaving] = (targets[leaving] + step[leaving]) % pages
+    return LinkGraph.from_edges([f"{i}.html" for i in range(pages)], sources, targets)
+
+
+if __name__ == "__main__":
+    main()
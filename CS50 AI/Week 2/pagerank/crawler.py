@@ -0,0 +1,282 @@
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Number of bytes read from an HTML file at a time
+CHUNK_SIZE = 1 << 16
+
+# Name of the link cache file kept inside a corpus directory
+CACHE = ".linkcache.npz"
+
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+TAG = re.compile(rb"<a\s")
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python crawler.py corpus")
+    pages, sources, targets, stats = crawl_cached(sys.argv[1])
+    print(f"Crawled {len(pages)} pages with {len(sources)} links")
+    print(f"  {stats['parsed']} parsed, {len(pages) - stats['parsed']} from cache")
+    print(f"  {stats['pages_per_second']:.0f} pages/s")
+    print(f"  {stats['bytes_per_second'] / 1e6:.2f} MB/s")
+
+
+def crawl_edges(directory, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Parse a directory of HTML pages in parallel and check for links to
+    other pages in the corpus.
+
+    Return a tuple (pages, sources, targets, stats) where `pages` is the
+    sorted list of page names, page `pages[sources[k]]` links to page
+    `pages[targets[k]]`, and `stats` records the pages and bytes parsed
+    and the throughput of the crawl.
+    """
+    start = time.perf_counter()
+    pages = sorted(
+        filename for filename in os.listdir(directory) if filename.endswith(".html")
+    )
+    paths = [os.path.join(directory, page) for page in pages]
+
+    results = scan_files(paths, processes, chunk_size)
+    sources, targets = link_edges(pages, [links for links, _ in results])
+    stats = crawl_stats(
+        len(pages), sum(size for _, size in results), time.perf_counter() - start
+    )
+    return pages, sources, targets, stats
+
+
+def crawl_cached(directory, cache=None, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Same as `crawl_edges`, but keep the links found in every page in a
+    cache file (by default CACHE inside `directory`) keyed by the file's
+    name, modification time and size. Only new or changed files are parsed
+    again; pages whose files were deleted drop out of the cache.
+
+    `stats` additionally records how many files were parsed. A cache that
+    cannot be written, such as in a read-only corpus, is skipped.
+    """
+    start = time.perf_counter()
+    cache = cache or os.path.join(directory, CACHE)
+    pages = sorted(
+        filename for filename in os.listdir(directory) if filename.endswith(".html")
+    )
+    stamps = [os.stat(os.path.join(directory, page)) for page in pages]
+    mtimes = np.array([stamp.st_mtime_ns for stamp in stamps], dtype=np.int64)
+    sizes = np.array([stamp.st_size for stamp in stamps], dtype=np.int64)
+
+    # Reuse the links of every page whose file is unchanged
+    old = load_cache(cache)
+    position = {name: i for i, name in enumerate(old["names"])}
+    vocabulary = {link: k for k, link in enumerate(old["vocabulary"])}
+    links = []
+    changed = []
+    for i, page in enumerate(pages):
+        k = position.get(page)
+        if (
+            k is not None
+            and old["mtimes"][k] == mtimes[i]
+            and old["sizes"][k] == sizes[i]
+        ):
+            links.append(old["links"][old["offsets"][k] : old["offsets"][k + 1]])
+        else:
+            links.append(None)
+            changed.append(i)
+
+    # Parse new or changed files
+    results = scan_files(
+        [os.path.join(directory, pages[i]) for i in changed], processes, chunk_size
+    )
+    for i, (found, _) in zip(changed, results):
+        ids = [vocabulary.setdefault(link, len(vocabulary)) for link in found]
+        links[i] = np.unique(np.array(ids, dtype=np.int32))
+
+    counts = np.array([len(ids) for ids in links], dtype=np.int64)
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    ids = np.concatenate(links) if links else np.zeros(0, dtype=np.int32)
+    vocabulary = list(vocabulary)
+
+    if changed or len(old["names"]) != len(pages):
+        try:
+            save_cache(cache, pages, mtimes, sizes, offsets, ids, vocabulary)
+        except OSError:
+            pass
+
+    # Only include links to other pages in the corpus
+    index = {page: i for i, page in enumerate(pages)}
+    lookup = np.array([index.get(link, -1) for link in vocabulary], dtype=np.int64)
+    sources = np.repeat(np.arange(len(pages), dtype=np.int64), counts)
+    targets = lookup[ids] if len(ids) else np.zeros(0, dtype=np.int64)
+    keep = (targets >= 0) & (targets != sources)
+    keys = np.sort(sources[keep] * len(pages) + targets[keep])
+    sources, targets = (
+        (keys // len(pages), keys % len(pages)) if len(pages) else (keys, keys)
+    )
+
+    stats = crawl_stats(
+        len(pages), sum(size for _, size in results), time.perf_counter() - start
+    )
+    stats["parsed"] = len(changed)
+    return pages, sources, targets, stats
+
+
+def load_cache(path):
+    """
+    Load a link cache written by `save_cache` into a dictionary of its
+    arrays, with empty arrays if there is no readable cache at `path`.
+    """
+    try:
+        with np.load(path) as data:
+            return {
+                "names": data["names"].tolist(),
+                "mtimes": data["mtimes"],
+                "sizes": data["sizes"],
+                "offsets": data["offsets"],
+                "links": data["links"],
+                "vocabulary": data["vocabulary"].tolist(),
+            }
+    except (OSError, KeyError, ValueError):
+        return {
+            "names": [],
+            "mtimes": np.zeros(0, dtype=np.int64),
+            "sizes": np.zeros(0, dtype=np.int64),
+            "offsets": np.zeros(1, dtype=np.int64),
+            "links": np.zeros(0, dtype=np.int32),
+            "vocabulary": [],
+        }
+
+
+def save_cache(path, names, mtimes, sizes, offsets, links, vocabulary):
+    """
+    Write a link cache to `path`. The link targets found in page `names[i]`
+    are `vocabulary[k]` for every id `k` in `links[offsets[i]:offsets[i + 1]]`.
+    Targets no longer referenced by any page are dropped from the vocabulary.
+    """
+    used, links = np.unique(links, return_inverse=True)
+    vocabulary = [vocabulary[k] for k in used]
+
+    # Write to a uniquely named file next to the cache and swap it in, so a
+    # crash never leaves half a file and concurrent crawls do not collide
+    descriptor, temporary = tempfile.mkstemp(
+        suffix=".npz", prefix=os.path.basename(path), dir=os.path.dirname(path)
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            np.savez(
+                f,
+                names=np.array(names, dtype=str),
+                mtimes=mtimes,
+                sizes=sizes,
+                offsets=offsets,
+                links=links.astype(np.int32),
+                vocabulary=np.array(vocabulary, dtype=str),
+            )
+        os.chmod(temporary, 0o666 & ~umask())
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def umask():
+    """
+    Return the file mode creation mask of the process.
+    """
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def scan_files(paths, processes=None, chunk_size=CHUNK_SIZE):
+    """
+    Run `scan_file` on every path, on a process pool unless `processes`
+    is 1, and return the results in order.
+    """
+    if processes == 1 or len(paths) < 2:
+        return [scan_file(path, chunk_size) for path in paths]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(
+            executor.map(
+                scan_file,
+                paths,
+                [chunk_size] * len(paths),
+                chunksize=max(1, len(paths) // 256),
+            )
+        )
+
+
+def link_edges(pages, links):
+    """
+    Return source and target index arrays for the links between pages,
+    where `links[i]` lists the link targets found in `pages[i]`.
+    Only links to other pages in the corpus are included.
+    """
+    index = {page: i for i, page in enumerate(pages)}
+    sources = []
+    targets = []
+    for i, found in enumerate(links):
+        for j in sorted(set(index[link] for link in found if link in index) - {i}):
+            sources.append(i)
+            targets.append(j)
+    return np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+
+def crawl_stats(pages, size, seconds):
+    """
+    Return the statistics dictionary of a crawl.
+    """
+    return {
+        "pages": pages,
+        "bytes": size,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds if seconds else 0,
+        "bytes_per_second": size / seconds if seconds else 0,
+    }
+
+
+def scan_file(path, chunk_size=CHUNK_SIZE):
+    """
+    Read the HTML file at `path` in chunks of `chunk_size` bytes and
+    return the list of link targets found in it and the file size.
+
+    A link tag that is cut by the end of a chunk is carried over and
+    matched again together with the next chunk.
+    """
+    links = []
+    size = 0
+    carry = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            size += len(chunk)
+            buffer = carry + chunk
+            end = 0
+            for match in LINK.finditer(buffer):
+                links.append(match.group(1).decode("utf-8", "replace"))
+                end = match.end()
+            if not chunk:
+                break
+            carry = buffer[unfinished_tag(buffer, end) :]
+    return links, size
+
+
+def unfinished_tag(buffer, start):
+    """
+    Return the position of the first link tag after `start` in `buffer`
+    that has not been closed yet, or the position of the last byte
+    if there is none (it may begin a tag).
+    """
+    for tag in TAG.finditer(buffer, start):
+        if buffer.find(b">", tag.start()) == -1:
+            return tag.start()
+    return max(start, len(buffer) - 2)
+
+
+if __name__ == "__main__":
+    main()
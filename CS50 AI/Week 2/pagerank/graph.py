@@ -0,0 +1,177 @@
+import numpy as np
+
+
+class LinkGraph:
+    """
+    Link graph of a corpus with integer page indices.
+
+    Out-links are stored in compressed sparse row (CSR) form:
+    the pages linked to by page `i` are `indices[indptr[i]:indptr[i + 1]]`.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        """
+        Create a new graph from a list of page names and CSR arrays.
+        """
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+        # Number of links of every page, and pages with no links at all
+        self.out_degree = np.diff(self.indptr)
+        self.dangling = self.out_degree == 0
+
+        # Source page of every link, and the probability of following it
+        self.sources = np.repeat(np.arange(len(self.pages)), self.out_degree)
+        self.weights = 1 / self.out_degree[self.sources]
+
+        # Links grouped by target page, built on first use
+        self._in_links = None
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def edges(self):
+        """Number of links in the graph."""
+        return len(self.indices)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a corpus dictionary mapping a page
+        to the set of pages it links to.
+        Links to pages outside the corpus are ignored.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        indptr = [0]
+        indices = []
+        for page in pages:
+            links = sorted(index[link] for link in corpus[page] if link in index)
+            indices.extend(links)
+            indptr.append(len(indices))
+        return cls(pages, indptr, indices)
+
+    @classmethod
+    def from_edges(cls, pages, sources, targets):
+        """
+        Build a graph from parallel arrays of source and target page indices.
+        Duplicate links are dropped.
+        """
+        n = len(pages)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        keys = np.sort(sources * n + targets)
+        unique = np.ones(len(keys), dtype=bool)
+        unique[1:] = keys[1:] != keys[:-1]
+        keys = keys[unique]
+        sources, targets = np.divmod(keys, n) if n else (keys, keys)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return cls(pages, indptr, targets)
+
+    def to_corpus(self):
+        """
+        Return the graph as a corpus dictionary mapping a page
+        to the set of pages it links to.
+        """
+        return {
+            page: set(
+                self.pages[j] for j in self.indices[self.indptr[i] : self.indptr[i + 1]]
+            )
+            for i, page in enumerate(self.pages)
+        }
+
+    def with_changes(
+        self, added_links=(), removed_links=(), added_pages=(), removed_pages=()
+    ):
+        """
+        Return a new graph with the given changes applied.
+        Links are (source, target) pairs of page names; pages named in
+        `added_links` are added if needed, and removing a page also
+        removes every link to or from it.
+        """
+        removed_pages = set(removed_pages)
+        pages = [page for page in self.pages if page not in removed_pages]
+        seen = set(self.pages) | removed_pages
+        for page in list(added_pages) + [p for link in added_links for p in link]:
+            if page not in seen:
+                seen.add(page)
+                pages.append(page)
+        index = {page: i for i, page in enumerate(pages)}
+
+        # Keep the existing links between remaining pages, minus removed ones
+        n = len(self)
+        remap = np.array([index.get(page, -1) for page in self.pages], dtype=np.int64)
+        sources = remap[self.sources]
+        targets = remap[self.indices]
+        removed = np.array(
+            [
+                self.index[source] * n + self.index[target]
+                for source, target in removed_links
+                if source in self.index and target in self.index
+            ],
+            dtype=np.int64,
+        )
+        keep = (sources >= 0) & (targets >= 0)
+        keep &= ~np.isin(self.sources * n + self.indices, removed)
+
+        added = [
+            (index[source], index[target])
+            for source, target in added_links
+            if source in index and target in index and source != target
+        ]
+        added_sources = np.array([s for s, _ in added], dtype=np.int64)
+        added_targets = np.array([t for _, t in added], dtype=np.int64)
+        return LinkGraph.from_edges(
+            pages,
+            np.concatenate((sources[keep], added_sources)),
+            np.concatenate((targets[keep], added_targets)),
+        )
+
+    def links(self, i):
+        """Return the indices of the pages linked to by page `i`."""
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def follow(self, ranks):
+        """
+        Return the rank each page receives through links when every page
+        splits its rank in `ranks` evenly among the pages it links to.
+        Rank held by pages with no links is not distributed.
+        """
+        flow = ranks[self.sources] * self.weights
+        return np.bincount(self.indices, weights=flow, minlength=len(self))
+
+    def follow_many(self, ranks):
+        """
+        Same as `follow` for a matrix with one rank vector per column.
+        """
+        in_indptr, in_sources, in_weights = self.in_links()
+        flow = ranks[in_sources] * in_weights[:, None]
+        result = np.zeros((len(self), ranks.shape[1]))
+        linked = in_indptr[:-1] < in_indptr[1:]
+        if linked.any():
+            result[linked] = np.add.reduceat(flow, in_indptr[:-1][linked], axis=0)
+        return result
+
+    def in_links(self):
+        """
+        Return the links grouped by target page as a tuple
+        (in_indptr, in_sources, in_weights): the links into page `i` come
+        from `in_sources[in_indptr[i]:in_indptr[i + 1]]` and are followed
+        with probability `in_weights` for the same slice.
+        """
+        if self._in_links is None:
+            order = np.argsort(self.indices, kind="stable")
+            in_indptr = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=len(self)), out=in_indptr[1:])
+            self._in_links = (in_indptr, self.sources[order], self.weights[order])
+        return self._in_links
+
+    def ranks_to_dict(self, ranks):
+        """
+        Return a dictionary mapping each page name to its value in `ranks`.
+        """
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
@@ -0,0 +1,195 @@
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from solvers import MAX_ITERATIONS, TOLERANCE
+
+# Edge files start with this marker, the number of pages, the number of
+# links and the byte width of a page index. The links follow as
+# (source, target) pairs sorted by target, then the out-degree of every page.
+MAGIC = b"PRLINKS1"
+HEADER = struct.Struct("<8sqqq")
+
+# Number of links read from an edge file at a time
+BLOCK_EDGES = 1 << 22
+
+# Number of target ranges links are distributed over while sorting
+BUCKETS = 64
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python outofcore.py edgefile")
+    pages, ranks, stats = out_of_core_pagerank(sys.argv[1], 0.85)
+    for record in stats:
+        print(
+            f"Iteration {record['iteration']}: residual {record['residual']:.2e}, "
+            f"{record['edges_per_second'] / 1e6:.1f}M links/s"
+        )
+    for i in np.argsort(ranks)[::-1][:10]:
+        print(f"  {pages[i] if pages else i}: {ranks[i]:.6f}")
+
+
+def write_edge_file(path, pages, chunks, buckets=BUCKETS):
+    """
+    Write the links given by `chunks`, an iterable of (sources, targets)
+    index arrays, to the edge file at `path`, with duplicate links and
+    links from a page to itself dropped.
+    `pages` is the list of page names, or the number of pages.
+
+    Links are first spread over `buckets` temporary files by target range,
+    so only one bucket at a time has to fit in memory while sorting.
+    """
+    names = None if isinstance(pages, int) else list(pages)
+    n = pages if names is None else len(names)
+    dtype = np.dtype("<u4") if n < 2**32 else np.dtype("<i8")
+    bounds = np.linspace(0, n, min(buckets, max(n, 1)) + 1).astype(np.int64)
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        paths = [os.path.join(tmp, f"{b}.bin") for b in range(len(bounds) - 1)]
+        files = [open(bucket, "wb") for bucket in paths]
+        try:
+            for sources, targets in chunks:
+                sources = np.asarray(sources, dtype=np.int64)
+                targets = np.asarray(targets, dtype=np.int64)
+                keep = sources != targets
+                pairs = np.column_stack((sources[keep], targets[keep])).astype(dtype)
+                bucket = np.searchsorted(bounds, targets[keep], side="right") - 1
+                order = np.argsort(bucket, kind="stable")
+                ends = np.cumsum(np.bincount(bucket, minlength=len(files)))
+                first = 0
+                for b, last in enumerate(ends):
+                    if last > first:
+                        files[b].write(pairs[order[first:last]].tobytes())
+                    first = last
+        finally:
+            for f in files:
+                f.close()
+
+        edges = 0
+        degree = np.zeros(n, dtype=np.int64)
+        with open(path, "wb") as out:
+            out.write(HEADER.pack(MAGIC, n, 0, dtype.itemsize))
+            for bucket in paths:
+                pairs = np.fromfile(bucket, dtype=dtype).reshape(-1, 2)
+                pairs = pairs[np.lexsort((pairs[:, 0], pairs[:, 1]))]
+                unique = np.ones(len(pairs), dtype=bool)
+                unique[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+                sources = pairs[unique, 0].astype(np.int64)
+                targets = pairs[unique, 1]
+                out.write(np.column_stack((sources, targets)).astype(dtype).tobytes())
+                degree += np.bincount(sources, minlength=n)
+                edges += len(sources)
+            out.write(degree.astype(dtype).tobytes())
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, n, edges, dtype.itemsize))
+
+    # Names left over from an earlier file would not match these pages
+    if names is not None:
+        with open(path + ".pages", "w") as f:
+            f.write("".join(f"{name}\n" for name in names))
+    elif os.path.exists(path + ".pages"):
+        os.remove(path + ".pages")
+
+
+def write_graph(path, graph):
+    """
+    Write a LinkGraph to the edge file at `path`.
+    """
+    write_edge_file(path, graph.pages, [(graph.sources, graph.indices)])
+
+
+def open_edge_file(path):
+    """
+    Memory-map the edge file at `path`.
+    Return the list of page names (or the number of pages if the names
+    were not saved), an array with one (source, target) row per link
+    sorted by target, and the out-degree of every page.
+    """
+    with open(path, "rb") as f:
+        magic, n, edges, itemsize = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an edge file")
+    dtype = np.dtype("<u4") if itemsize == 4 else np.dtype("<i8")
+    links = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(edges, 2))
+    degree = np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=HEADER.size + edges * 2 * itemsize,
+        shape=(n,),
+    )
+    pages = n
+    if os.path.exists(path + ".pages"):
+        with open(path + ".pages") as f:
+            pages = f.read().splitlines()
+        if len(pages) != n:
+            raise ValueError(
+                f"{path}.pages names {len(pages)} pages, but {path} has {n}"
+            )
+    return pages, links, degree
+
+
+def out_of_core_pagerank(
+    path,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    block_edges=BLOCK_EDGES,
+):
+    """
+    Run power iteration over the links in the edge file at `path`, reading
+    `block_edges` links at a time, so that only vectors with one entry per
+    page stay in memory.
+
+    Return the list of page names (None if not saved), the rank vector, and
+    a list with one record per iteration of the residual, the time taken
+    and the number of links processed per second.
+    """
+    pages, links, degree = open_edge_file(path)
+    n = pages if isinstance(pages, int) else len(pages)
+    blocks = range(0, len(links), block_edges)
+    dangling = np.asarray(degree) == 0
+    share = np.where(dangling, 0, 1 / np.maximum(degree, 1))
+
+    ranks = np.full(n, 1 / n)
+    stats = []
+    for iteration in range(1, max_iterations + 1):
+        start = time.perf_counter()
+        weighted = ranks * share
+        flow = np.zeros(n)
+        for first in blocks:
+
+            # Links are sorted by target, so a block only touches a range of pages
+            block = np.asarray(links[first : first + block_edges], dtype=np.int64)
+            low, high = block[0, 1], block[-1, 1] + 1
+            flow[low:high] += np.bincount(
+                block[:, 1] - low, weights=weighted[block[:, 0]], minlength=high - low
+            )
+        new_ranks = (1 - damping_factor) / n + damping_factor * (
+            flow + ranks[dangling].sum() / n
+        )
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+
+        seconds = time.perf_counter() - start
+        stats.append(
+            {
+                "iteration": iteration,
+                "residual": float(residual),
+                "seconds": seconds,
+                "edges_per_second": len(links) / seconds if seconds else 0,
+            }
+        )
+        if residual < tolerance:
+            break
+    return None if isinstance(pages, int) else pages, ranks, stats
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ import re
 import sys
 import copy
 
+from crawler import crawl_cached
+from graph import LinkGraph
+
 DAMPING = 0.85
 SAMPLES = 10000
 
@@ -11,7 +14,8 @@ SAMPLES = 10000
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    pages, sources, targets, _ = crawl_cached(sys.argv[1])
+    corpus = LinkGraph.from_edges(pages, sources, targets).to_corpus()
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -137,7 +141,7 @@ def check_values(pr_1, pr_2):
     Return True if the difference between values is less than 0.001
     """
     for page in pr_1.keys():
-        if pr_1[page] - pr_2[page] > 0.001:
+        if abs(pr_1[page] - pr_2[page]) > 0.001:
             return False
     return True
 
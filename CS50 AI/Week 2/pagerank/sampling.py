@@ -0,0 +1,145 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from graph import LinkGraph
+
+
+def fast_sample_pagerank(corpus, damping_factor, n):
+    """
+    Return PageRank values for each page by sampling `n` pages
+    according to the transition model, starting with a page at random.
+    Same result as `pagerank.sample_pagerank` but every step costs O(1).
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    counts = walk(graph, damping_factor, n)
+    return {page: count / n for page, count in zip(graph.pages, counts)}
+
+
+def walk(graph, damping_factor, n, rng=random):
+    """
+    Follow one random surfer for `n` pages on `graph`, starting with a
+    page at random, and return how often each page was visited.
+
+    Each step draws a single random number `r`: if `r < damping_factor`
+    a link is followed, the link being picked by where `r` falls below
+    `damping_factor`; otherwise a page is picked uniformly by where `r`
+    falls above it. Pages with no links always jump to a random page.
+    """
+    pages = len(graph)
+
+    # Plain lists make single-element lookups much cheaper than arrays
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    degree = graph.out_degree.tolist()
+    last = pages - 1
+
+    counts = [0] * pages
+    page = rng.randrange(pages)
+    counts[page] += 1
+    draw = rng.random
+    for _ in range(n - 1):
+        r = draw()
+        links = degree[page]
+        if links == 0:
+            page = int(r * pages)
+        elif r < damping_factor:
+            link = int(r / damping_factor * links)
+            page = indices[indptr[page] + (link if link < links else links - 1)]
+        else:
+            page = int((r - damping_factor) / (1 - damping_factor) * pages)
+            if page > last:
+                page = last
+        counts[page] += 1
+    return counts
+
+
+def monte_carlo_pagerank(
+    corpus, damping_factor, walkers=1000, steps=100, blocks=8, processes=1, seed=None
+):
+    """
+    Estimate PageRank by advancing `walkers` random surfers in lockstep for
+    `steps` pages each. Walkers are split into `blocks` with independent
+    random streams; blocks run on `processes` worker processes.
+
+    Return a pair of dictionaries keyed by page name: the estimated
+    PageRank values (summing to 1) and the standard error of each estimate,
+    computed from the spread between blocks.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, errors = parallel_walk(
+        graph, damping_factor, walkers, steps, blocks, processes, seed
+    )
+    return graph.ranks_to_dict(ranks), graph.ranks_to_dict(errors)
+
+
+def parallel_walk(
+    graph, damping_factor, walkers, steps, blocks, processes=1, seed=None
+):
+    """
+    Run `blocks` independent blocks of walkers on `graph` and merge them.
+    The result does not depend on `processes`, only on `seed` and `blocks`.
+    Return the rank estimate and its standard error per page.
+    """
+    if blocks < 2:
+        raise ValueError("at least two blocks are needed to estimate variance")
+    sizes = [walkers // blocks + (b < walkers % blocks) for b in range(blocks)]
+    streams = np.random.SeedSequence(seed).spawn(blocks)
+    jobs = [
+        (graph, damping_factor, size, steps, stream)
+        for size, stream in zip(sizes, streams)
+    ]
+    if processes == 1:
+        counts = [walk_block(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            counts = list(executor.map(walk_block, *zip(*jobs)))
+
+    # Each block gives an estimate, their spread gives the variance of the mean
+    estimates = np.array([c / c.sum() for c in counts])
+    ranks = np.sum(counts, axis=0) / np.sum(counts)
+    errors = estimates.std(axis=0, ddof=1) / math.sqrt(blocks)
+    return ranks, errors
+
+
+def walk_block(graph, damping_factor, walkers, steps, stream):
+    """
+    Advance `walkers` random surfers on `graph` for `steps` pages each,
+    all at once, drawing from the random stream `stream`.
+    Walkers start on pages chosen at random.
+    Return how often each page was visited.
+    """
+    rng = np.random.default_rng(stream)
+    pages = len(graph)
+    position = rng.integers(pages, size=walkers)
+    counts = np.bincount(position, minlength=pages)
+    for _ in range(steps - 1):
+        r = rng.random(walkers)
+        degree = graph.out_degree[position]
+        follow = (r < damping_factor) & (degree > 0)
+        jump = rng.integers(pages, size=walkers)
+        if follow.any():
+            link = np.minimum(
+                (r / damping_factor * degree).astype(np.int64), degree - 1
+            )
+            target = np.where(follow, graph.indptr[position] + link, 0)
+            jump[follow] = graph.indices[target[follow]]
+        position = jump
+        counts += np.bincount(position, minlength=pages)
+    return counts
+
+
+def required_samples(errors, samples, target):
+    """
+    Return the number of samples needed for the largest standard error
+    in `errors`, observed with `samples` samples, to fall to `target`.
+    Standard errors shrink with the square root of the number of samples.
+    """
+    worst = max(errors.values()) if isinstance(errors, dict) else max(errors)
+    return math.ceil(samples * (worst / target) ** 2)
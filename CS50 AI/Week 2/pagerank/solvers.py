@@ -0,0 +1,417 @@
+import numpy as np
+
+from graph import LinkGraph
+
+# Stop once the L1 norm of the change in ranks falls below this value
+TOLERANCE = 1e-8
+
+# Give up on convergence after this many iterations
+MAX_ITERATIONS = 1000
+
+# Number of page blocks updated in turn by Gauss-Seidel sweeps
+BLOCKS = 64
+
+# Number of power iterations between two extrapolation steps
+PERIOD = 10
+
+# Largest fraction of all links that may lead into pages still changing
+# for adaptive iteration to update only those pages
+ACTIVE_FRACTION = 0.5
+
+# Bytes of working memory a block of personalized rank vectors may use
+MAX_MEMORY = 1 << 28
+
+
+def sparse_pagerank(
+    corpus, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS
+):
+    """
+    Return PageRank values for each page of `corpus` computed by power
+    iteration over a sparse link matrix.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    ranks, _, _ = power_iteration(graph, damping_factor, tolerance, max_iterations)
+    return graph.ranks_to_dict(ranks)
+
+
+def step(graph, ranks, damping_factor):
+    """
+    Return the ranks after one application of the PageRank update.
+    Pages with no links are treated as linking to every page.
+    """
+    n = len(graph)
+    leaked = ranks[graph.dangling].sum()
+    return (1 - damping_factor) / n + damping_factor * (
+        graph.follow(ranks) + leaked / n
+    )
+
+
+def power_iteration(
+    graph,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    start=None,
+    residuals=None,
+):
+    """
+    Iterate the PageRank update on `graph` starting from the rank vector
+    `start` (by default the uniform distribution) until the L1 change is
+    below `tolerance` or `max_iterations` is reached.
+    If `residuals` is a list, the L1 change of every iteration is appended.
+    Return the rank vector, the number of iterations made and whether the
+    change fell below `tolerance` before `max_iterations` was reached.
+    """
+    n = len(graph)
+    ranks = np.full(n, 1 / n) if start is None else start
+    for iteration in range(1, max_iterations + 1):
+        new_ranks = step(graph, ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residuals is not None:
+            residuals.append(float(residual))
+        if residual < tolerance:
+            break
+    return ranks, iteration, bool(residual < tolerance)
+
+
+def incremental_pagerank(
+    graph,
+    previous,
+    damping_factor,
+    added_links=(),
+    removed_links=(),
+    added_pages=(),
+    removed_pages=(),
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+):
+    """
+    Recompute PageRank after changes to `graph`, warm-starting power
+    iteration from `previous`, a dictionary of PageRank values computed
+    before the changes. Changes are given as in `LinkGraph.with_changes`.
+    Return the changed graph, its rank vector, the number of iterations and
+    whether they converged.
+    """
+    graph = graph.with_changes(added_links, removed_links, added_pages, removed_pages)
+    ranks, iterations, converged = power_iteration(
+        graph, damping_factor, tolerance, max_iterations, warm_start(graph, previous)
+    )
+    return graph, ranks, iterations, converged
+
+
+def warm_start(graph, previous):
+    """
+    Return a starting rank vector for `graph` from a dictionary of earlier
+    PageRank values. Pages without an earlier value start at 1 / N and the
+    vector is scaled to sum to 1.
+    """
+    n = len(graph)
+    ranks = np.array([previous.get(page, 1 / n) for page in graph.pages])
+    return ranks / ranks.sum()
+
+
+def gauss_seidel(
+    graph,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    start=None,
+    blocks=BLOCKS,
+    residuals=None,
+):
+    """
+    Sweep over `graph` in `blocks` blocks of pages, updating the ranks of
+    each block in place so that later blocks already use the new ranks of
+    earlier ones. With one block per page this is plain Gauss-Seidel.
+    Residuals are recorded as in `power_iteration`.
+    Return the rank vector, the number of sweeps made and whether they
+    converged.
+    """
+    n = len(graph)
+    ranks = np.full(n, 1 / n) if start is None else start.copy()
+    in_indptr, in_sources, in_weights = graph.in_links()
+    targets = np.repeat(np.arange(n), np.diff(in_indptr))
+    bounds = np.linspace(0, n, min(blocks, n) + 1).astype(np.int64)
+    leaked = ranks[graph.dangling].sum()
+
+    for iteration in range(1, max_iterations + 1):
+        previous = ranks.copy()
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            first, last = in_indptr[low], in_indptr[high]
+            flow = np.bincount(
+                targets[first:last] - low,
+                weights=ranks[in_sources[first:last]] * in_weights[first:last],
+                minlength=high - low,
+            )
+            new = (1 - damping_factor) / n + damping_factor * (flow + leaked / n)
+            change = new - ranks[low:high]
+            ranks[low:high] = new
+            leaked += change[graph.dangling[low:high]].sum()
+
+        # Keep the ranks summing to 1 so the error along it does not linger
+        total = ranks.sum()
+        ranks /= total
+        leaked /= total
+        residual = np.abs(ranks - previous).sum()
+        if residuals is not None:
+            residuals.append(float(residual))
+        if residual < tolerance:
+            break
+    return ranks, iteration, bool(residual < tolerance)
+
+
+def extrapolated_iteration(
+    graph,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    start=None,
+    method="quadratic",
+    period=PERIOD,
+    residuals=None,
+):
+    """
+    Power iteration on `graph` where every `period` iterations the last
+    iterates are extrapolated towards the limit, either per page with
+    Aitken's delta-squared process (`method="aitken"`) or with quadratic
+    extrapolation over the last four iterates (`method="quadratic"`).
+
+    An extrapolated vector costs one iteration to check and is only kept
+    if the change it makes under the PageRank update is smaller than that
+    of the last plain iteration; otherwise plain iteration carries on.
+    Residuals are recorded as in `power_iteration`.
+    Return the rank vector, the number of iterations made and whether they
+    converged.
+    """
+    n = len(graph)
+    ranks = np.full(n, 1 / n) if start is None else start
+    history = [ranks]
+    iteration = 0
+    residual = np.inf
+    plain = 0
+    while iteration < max_iterations and residual >= tolerance:
+        new_ranks = step(graph, ranks, damping_factor)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iteration += 1
+        plain += 1
+        if residuals is not None:
+            residuals.append(float(residual))
+        history = history[-3:] + [ranks]
+        if (
+            plain < period
+            or len(history) < 4
+            or residual < tolerance
+            or iteration == max_iterations
+        ):
+            continue
+
+        # Try the extrapolated vector, one PageRank update away
+        limit = extrapolate(history, method)
+        plain = 0
+        if limit is None:
+            continue
+        new_limit = step(graph, limit, damping_factor)
+        trial = np.abs(new_limit - limit).sum()
+        iteration += 1
+        if residuals is not None:
+            residuals.append(float(trial))
+        if trial < residual:
+            ranks, residual = new_limit, trial
+            history = [limit, new_limit]
+    return ranks, iteration, bool(residual < tolerance)
+
+
+def extrapolate(history, method):
+    """
+    Return an estimate of the limit of the iterates in `history`,
+    the most recent last, scaled to sum to 1; or None if the estimate is
+    not a probability distribution, as happens when it overshoots.
+    """
+    if method == "aitken":
+        x0, x1, x2 = history[-3:]
+        denominator = x2 - 2 * x1 + x0
+        safe = np.abs(denominator) > 1e-15
+        limit = x2.copy()
+        limit[safe] = x2[safe] - (x2[safe] - x1[safe]) ** 2 / denominator[safe]
+    elif method == "quadratic":
+        x0, x1, x2, x3 = history
+        y = np.column_stack((x1 - x0, x2 - x0))
+        gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+        g1, g2, g3 = gamma[0], gamma[1], 1
+        limit = (g1 + g2 + g3) * x1 + (g2 + g3) * x2 + g3 * x3
+    else:
+        raise ValueError(f"unknown extrapolation method: {method}")
+
+    if not np.all(np.isfinite(limit)) or (limit < 0).any() or limit.sum() <= 0:
+        return None
+    return limit / limit.sum()
+
+
+def adaptive_iteration(
+    graph,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    start=None,
+    period=PERIOD,
+    active_fraction=ACTIVE_FRACTION,
+    residuals=None,
+):
+    """
+    Power iteration on `graph` that freezes every page whose rank changed
+    by less than `tolerance / N` and only updates the pages that have not
+    converged, following just their in-links, so an iteration costs time
+    in proportion to the links into active pages. While active pages have
+    more than `active_fraction` of all links, all pages are updated.
+    Every `period` iterations, and before stopping, all pages are updated
+    again to catch frozen pages that started moving.
+    Residuals are recorded as in `power_iteration`.
+    Return the rank vector, the number of iterations made and whether they
+    converged.
+    """
+    n = len(graph)
+    ranks = np.full(n, 1 / n) if start is None else start.copy()
+    in_indptr, all_sources, all_weights = graph.in_links()
+    converged = False
+    check = True
+
+    for iteration in range(1, max_iterations + 1):
+        if check:
+            new = step(graph, ranks, damping_factor)
+            change = np.abs(new - ranks)
+            ranks = new
+            residual = change.sum()
+            if residuals is not None:
+                residuals.append(float(residual))
+            if residual < tolerance:
+                converged = True
+                break
+            if iteration % period:
+                continue
+
+            # Gather the in-link slices of the pages that are still changing,
+            # unless they hold so many links that a full update is cheaper
+            pages = np.flatnonzero(change >= tolerance / n)
+            first = in_indptr[pages]
+            counts = in_indptr[pages + 1] - first
+            if counts.sum() > active_fraction * graph.edges:
+                continue
+            edges = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(
+                counts.sum()
+            )
+            targets = np.repeat(np.arange(len(pages)), counts)
+            sources = all_sources[edges]
+            weights = all_weights[edges]
+            dangling = graph.dangling[pages]
+            leaked = ranks[graph.dangling].sum()
+            check = False
+            continue
+
+        flow = np.bincount(
+            targets, weights=ranks[sources] * weights, minlength=len(pages)
+        )
+        new = (1 - damping_factor) / n + damping_factor * (flow + leaked / n)
+        change = new - ranks[pages]
+        ranks[pages] = new
+
+        # Frozen pages keep their rank, so only active pages change the leak
+        leaked += change[dangling].sum()
+        residual = np.abs(change).sum()
+        if residuals is not None:
+            residuals.append(float(residual))
+        if residual < tolerance or iteration % period == 0:
+            check = True
+    return ranks / ranks.sum(), iteration, converged
+
+
+def personalized_pagerank(
+    graph,
+    seeds,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    max_memory=MAX_MEMORY,
+):
+    """
+    Return a matrix with one personalized PageRank vector per column, one
+    for each teleport distribution in `seeds`. See
+    `personalized_pagerank_blocks` for the arguments.
+    """
+    result = np.zeros((len(graph), len(seeds)))
+    for columns, ranks in personalized_pagerank_blocks(
+        graph, seeds, damping_factor, tolerance, max_iterations, max_memory
+    ):
+        result[:, columns] = ranks
+    return result
+
+
+def personalized_pagerank_blocks(
+    graph,
+    seeds,
+    damping_factor,
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+    max_memory=MAX_MEMORY,
+):
+    """
+    Compute personalized PageRank on `graph` for each entry of `seeds`,
+    a list of teleport distributions, each either a set of page names
+    (teleport uniformly among them) or a dictionary mapping page names
+    to weights. Surfers on pages with no links also teleport this way.
+
+    Columns are computed together as a sparse matrix product, in blocks
+    small enough to keep working memory under about `max_memory` bytes.
+    Yield (columns, ranks) pairs where `ranks[:, k]` is the vector for
+    `seeds[columns][k]`.
+    """
+    n = len(graph)
+    width = max(1, max_memory // (8 * (graph.edges + 4 * n)))
+    for first in range(0, len(seeds), width):
+        columns = slice(first, min(first + width, len(seeds)))
+        teleport = teleport_matrix(graph, seeds[columns])
+        ranks = teleport.copy()
+        for _ in range(max_iterations):
+            leaked = ranks[graph.dangling].sum(axis=0)
+            new_ranks = (1 - damping_factor) * teleport + damping_factor * (
+                graph.follow_many(ranks) + teleport * leaked
+            )
+            residual = np.abs(new_ranks - ranks).sum(axis=0).max()
+            ranks = new_ranks
+            if residual < tolerance:
+                break
+        yield columns, ranks
+
+
+def teleport_matrix(graph, seeds):
+    """
+    Return a matrix whose columns are the teleport distributions in `seeds`
+    (sets of page names or dictionaries of weights), each summing to 1.
+    """
+    matrix = np.zeros((len(graph), len(seeds)))
+    for k, seed in enumerate(seeds):
+        weights = seed if isinstance(seed, dict) else dict.fromkeys(seed, 1)
+        for page, weight in weights.items():
+            matrix[graph.index[page], k] += weight
+        total = matrix[:, k].sum()
+        if total <= 0:
+            raise ValueError(f"teleport distribution {k} has no weight")
+        matrix[:, k] /= total
+    return matrix
+
+
+# Solver strategies by name, all called as solver(graph, damping_factor, ...)
+SOLVERS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+    "aitken": lambda *args, **kwargs: extrapolated_iteration(
+        *args, method="aitken", **kwargs
+    ),
+    "quadratic": extrapolated_iteration,
+    "adaptive": adaptive_iteration,
+}
@@ -0,0 +1,102 @@
+import json
+import sys
+import time
+import tracemalloc
+
+from crawler import crawl_cached
+from graph import LinkGraph
+from solvers import MAX_ITERATIONS, SOLVERS, TOLERANCE
+
+DAMPING = 0.85
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python telemetry.py corpus [solver] [output.json]")
+    directory = sys.argv[1]
+    solver = sys.argv[2] if len(sys.argv) > 2 else "power"
+    output = sys.argv[3] if len(sys.argv) > 3 else None
+
+    ranks, record = run(directory, DAMPING, solver)
+    if output:
+        export(record, output)
+    print(f"PageRank Results from {solver} ({record['iterations']} iterations)")
+    if not record["converged"]:
+        print(f"  Did not converge to within {record['tolerance']}")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+    for phase, seconds in record["seconds"].items():
+        print(f"  {phase}: {seconds:.4f} s")
+    print(f"  Peak memory: {record['peak_memory'] / 1e6:.2f} MB")
+
+
+def run(
+    directory,
+    damping_factor,
+    solver="power",
+    tolerance=TOLERANCE,
+    max_iterations=MAX_ITERATIONS,
+):
+    """
+    Crawl `directory`, build its link graph and compute PageRank with the
+    named solver from `solvers.SOLVERS`, recording telemetry on the way.
+
+    Return the PageRank dictionary and a telemetry record with the
+    solver settings, the time spent crawling, building the graph and
+    iterating, the residual of every iteration, and peak traced memory.
+    """
+    seconds = {}
+    residuals = []
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    pages, sources, targets, _ = crawl_cached(directory)
+    seconds["crawl"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    graph = LinkGraph.from_edges(pages, sources, targets)
+    seconds["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranks, iterations, converged = SOLVERS[solver](
+        graph,
+        damping_factor,
+        tolerance=tolerance,
+        max_iterations=max_iterations,
+        residuals=residuals,
+    )
+    seconds["iterate"] = time.perf_counter() - start
+
+    _, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+
+    record = {
+        "corpus": directory,
+        "solver": solver,
+        "damping_factor": damping_factor,
+        "tolerance": tolerance,
+        "pages": len(graph),
+        "links": graph.edges,
+        "iterations": iterations,
+        "converged": converged,
+        "residuals": residuals,
+        "seconds": seconds,
+        "peak_memory": peak,
+    }
+    return graph.ranks_to_dict(ranks), record
+
+
+def export(record, path):
+    """
+    Write a telemetry record to `path` as JSON.
+    """
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+import os
+
+# Word indexes already built, keyed by the words file and its state
+INDEXES = {}
+
+
 class Variable:
 
     ACROSS = "across"
@@ -37,6 +43,100 @@ class Variable:
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class WordIndex:
+    """
+    Index of a dictionary, giving every word an integer id and keeping,
+    as integer bitsets over those ids, the words of every length and the
+    words with every letter at every position.
+    """
+
+    def __init__(self, words):
+        self.words = sorted(words)
+        self.ids = {word: i for i, word in enumerate(self.words)}
+        self.all = (1 << len(self.words)) - 1
+
+        # lengths[n] has the bits of words with n letters, and
+        # letters[k][c] those of words with letter c at position k
+        self.lengths = dict()
+        self.letters = []
+        for i, word in enumerate(self.words):
+            bit = 1 << i
+            self.lengths[len(word)] = self.lengths.get(len(word), 0) | bit
+            while len(self.letters) < len(word):
+                self.letters.append(dict())
+            for k, c in enumerate(word):
+                self.letters[k][c] = self.letters[k].get(c, 0) | bit
+
+    @classmethod
+    def load(cls, words_file):
+        """
+        Return the index of the words in `words_file`, building it only if
+        the file has not been indexed before or has changed since.
+        """
+        stat = os.stat(words_file)
+        key = (os.path.abspath(words_file), stat.st_mtime_ns, stat.st_size)
+        if key not in INDEXES:
+            with open(words_file) as f:
+                INDEXES[key] = cls(set(f.read().upper().splitlines()))
+        return INDEXES[key]
+
+    def position(self, k):
+        """
+        Return a dictionary mapping every letter to the bits of the words
+        with that letter at position `k`.
+        """
+        return self.letters[k] if k < len(self.letters) else dict()
+
+    def decode(self, bits):
+        """
+        Return the list of words whose ids are set in `bits`.
+        """
+        found = []
+        binary = bin(bits)[:1:-1]
+        i = binary.find("1")
+        while i != -1:
+            found.append(self.words[i])
+            i = binary.find("1", i + 1)
+        return found
+
+
+class Domain:
+    """
+    Set of words of a WordIndex, stored as a bitset of word ids so that
+    no variable keeps its own copy of the words.
+    """
+
+    def __init__(self, index, bits):
+        self.index = index
+        self.bits = bits
+
+    def __iter__(self):
+        return iter(self.index.decode(self.bits))
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __contains__(self, word):
+        i = self.index.ids.get(word)
+        return i is not None and (self.bits >> i) & 1 == 1
+
+    def __eq__(self, other):
+        if isinstance(other, Domain):
+            return self.bits == other.bits
+        return set(self) == other
+
+    def __repr__(self):
+        return f"Domain({set(self)})"
+
+    def remove(self, word):
+        if word not in self:
+            raise KeyError(word)
+        self.bits &= ~(1 << self.index.ids[word])
+
+    def copy(self):
+        return Domain(self.index, self.bits)
+
+
 class Crossword:
 
     def __init__(self, structure_file, words_file):
@@ -59,9 +159,9 @@ class Crossword:
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, with its index
+        self.index = WordIndex.load(words_file)
+        self.words = set(self.index.words)
 
         # Determine variable set
         self.variables = set()
@@ -11,8 +11,9 @@ class CrosswordCreator:
         Create new CSP crossword generate.
         """
         self.crossword: Crossword = crossword
+        index = self.crossword.index
         self.domains = {
-            var: self.crossword.words.copy() for var in self.crossword.variables
+            var: Domain(index, index.all) for var in self.crossword.variables
         }
 
     def letter_grid(self, assignment):
@@ -104,12 +105,10 @@ class CrosswordCreator:
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
+        # Keep only the words of the right length, using the length index
+        lengths = self.crossword.index.lengths
         for variable, domain in self.domains.items():
-            for word in list(domain):
-                if (
-                    len(word) != variable.length
-                ):  # Only store those words which are of equal length to the corsswords
-                    self.domains[variable].remove(word)
+            domain.bits &= lengths.get(variable.length, 0)
 
     def revise(self, x, y):
         """
@@ -120,23 +119,21 @@ class CrosswordCreator:
         Return True if a revision was made to the domain of `x`; return
         False if no revision was made.
         """
-        revise = False
-        intersections = self.crossword.overlaps[
-            (x, y)
-        ]  # Get all the overlaps, since those are the binary constraints
-        for X in list(self.domains[x]):
-            found = False
-            for Y in list(self.domains[y]):
-                if (
-                    X[intersections[0]] == Y[intersections[1]]
-                ):  # If there is atleast one word in both the domains, which has a letter at both positions then continue
-                    found = True
-                    break
-            if found == False:
-                self.domains[x].remove(X)
-                revise = True
-
-        return revise
+        i, j = self.crossword.overlaps[x, y]
+        index = self.crossword.index
+
+        # Words of x may only have at position i a letter that some word
+        # of y has at position j
+        allowed = 0
+        for letter, bits in index.position(j).items():
+            if self.domains[y].bits & bits:
+                allowed |= index.position(i).get(letter, 0)
+
+        revised = self.domains[x].bits & allowed
+        if revised == self.domains[x].bits:
+            return False
+        self.domains[x].bits = revised
+        return True
 
     def ac3(self, arcs: list = None):
         """